@@ -62,5 +62,125 @@ def return_longest_palindrome(s):
         right = left[::-1]
         return (left+right)
 
-print(return_longest_palindrome("CHARACTER"))
+# Complexity: O(len(s) * len(s)) time, O(len(s)) memory
+
+def char_codes(s):
+    # One integer per character so whole rows can be compared at once
+    return np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32)
+
+def palindrome_rows(s):
+    # Rows of the same table as return_longest_palindrome, bottom row first, keeping only the row below (i + 1)
+    # while row i is filled. Yields i and dp[i, i:], an array that is overwritten two rows later.
+    # When s[i] == s[j], dp[i+1, j-1] + 2 is never smaller than the other two cases, so every cell is
+    # dp[i, j] = max(dp[i+1, j-1] + 2 if s[i] == s[j], dp[i+1, j], dp[i, j-1])
+    # and since dp[i, j-1] is the cell just left of it, a row is the running maximum of the first two terms
+    n = len(s)
+    codes = char_codes(s)
+    below = np.zeros(n + 1, dtype=np.int64)  # dp[i+1, j] at index j + 1, with dp[i+1, i] = 0 at index i + 1
+    row = np.zeros(n + 1, dtype=np.int64)
+    for i in range(n - 1, -1, -1):
+        # candidates for j = i .. n-1: dp[i, i] is 1, the rest come from the row below
+        candidates = row[i + 1:]
+        np.maximum(below[i + 1:], below[i:n] + 2 * (codes[i:] == codes[i]), out=candidates)
+        candidates[0] = 1
+        np.maximum.accumulate(candidates, out=candidates)
+        yield i, candidates
+        below, row = row, below
+
+def longest_palindrome_length(s):
+    # Only the top row's last cell is the answer, so no row is kept past the next one
+    length = 0
+    for _, row in palindrome_rows(s):
+        length = int(row[-1])
+    return length
+
+def lcs_last_row(a, b):
+    # LCS lengths of all of a against every prefix of b, one row of the LCS table at a time:
+    # cell j is the max of the cell above, the cell above-left plus a match, and the cell to the left,
+    # so as above the row is a running maximum of the first two
+    row = np.zeros(len(b) + 1, dtype=np.int64)
+    for code in a:
+        candidates = np.maximum(row[1:], row[:-1] + (b == code))
+        np.maximum.accumulate(candidates, out=row[1:])
+    return row
+
+def lcs_pairs(a, b, a_offset=0, b_offset=0, pairs=None):
+    # Hirschberg: positions (in a, in b) of one longest common subsequence in O(len(b)) memory.
+    # Split a in half, find where the best path crosses that line from both ends, and recurse on either side
+    if pairs is None:
+        pairs = []
+    if len(a) == 0 or len(b) == 0:
+        return pairs
+    if len(a) == 1:
+        matches = np.flatnonzero(b == a[0])
+        if len(matches):
+            pairs.append((a_offset, b_offset + int(matches[0])))
+        return pairs
+    middle = len(a) // 2
+    upper = lcs_last_row(a[:middle], b)
+    lower = lcs_last_row(a[middle:][::-1], b[::-1])[::-1]
+    split = int(np.argmax(upper + lower))
+    lcs_pairs(a[:middle], b[:split], a_offset, b_offset, pairs)
+    lcs_pairs(a[middle:], b[split:], a_offset + middle, b_offset + split, pairs)
+    return pairs
+
+def longest_palindrome_linear(s):
+    # A longest palindromic subsequence in O(len(s)) memory, from an LCS of s and reversed s.
+    # That LCS has the right length but need not be a palindrome itself. Its t-th character sits at
+    # left[t] in s and, through the reversed copy, at right[t]; left rises while right falls. The
+    # characters where left is still before right form a palindrome left[0..k] + right[k..0], and the
+    # ones after the crossing another, mirrored the other way; one of the two has the full length
+    n = len(s)
+    if n == 0:
+        return ""
+    codes = char_codes(s)
+    pairs = lcs_pairs(codes, codes[::-1].copy())
+    length = len(pairs)
+    left = [p for p, _ in pairs]
+    right = [n - 1 - q for _, q in pairs]
+    k = sum(1 for t in range(length) if left[t] < right[t])
+    if 2 * k == length:
+        half = "".join(s[left[t]] for t in range(k))
+        return half + half[::-1]
+    # The crossing pairs share a middle character, the pairs after it give the rest of both halves
+    half = "".join(s[right[t]] for t in range(length - 1, k, -1))
+    return half + s[left[k]] + half[::-1]
+
+# Complexity: O(len(s) * len(s) / word size) time, O(len(s)) memory
+
+def longest_palindrome_length_bits(s):
+    # The length is also LCS(s, reversed s), and the LCS table can be run a whole row at a time with bit
+    # operations (Allison-Dix, in Hyyro's form). Bit p of a row stands for position p of s; a 0 bit marks
+    # a position where the LCS so far grows by one, so the LCS is the number of 0 bits.
+    # Python's integers have no size limit, so one integer holds the whole row
+    n = len(s)
+    if n == 0:
+        return 0
+    # masks[c] has bit p set wherever s[p] == c
+    masks = {}
+    for position, char in enumerate(s):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    all_ones = (1 << n) - 1
+    row = all_ones
+    # one step per character of reversed s
+    for char in reversed(s):
+        matches = row & masks[char]
+        # the carry of the addition moves each match to the next unused 0 bit to its left
+        row = ((row + matches) | (row - matches)) & all_ones
+    return n - row.bit_count()
+
+# Largest string reconstructed with the full table; past it the table would take gigabytes, so the
+# O(n) memory version is used (same length, possibly a different palindrome where several are longest)
+TABLE_LIMIT = 5000
+
+def longest_palindrome(s, length_only=False):
+    # The bit-parallel engine when only the length is wanted, the DP when the palindrome itself is
+    if length_only:
+        return longest_palindrome_length_bits(s)
+    if 0 < len(s) <= TABLE_LIMIT:
+        return return_longest_palindrome(s)
+    return longest_palindrome_linear(s)
+
+if __name__ == "__main__":
+    print(return_longest_palindrome("CHARACTER"))
 
@@ -0,0 +1,78 @@
+"""Time the longest palindromic subsequence engines on random strings.
+
+    python lps_benchmark.py                       # n = 1k, 10k and 100k
+    python lps_benchmark.py --sizes 1000 --table-limit 10000
+
+table is return_longest_palindrome, rows is longest_palindrome_length (two
+rolling rows) and bits is longest_palindrome_length_bits. The table needs
+n * n integers, so it only runs up to --table-limit characters; the rows
+engine only up to --rows-limit. Every engine that runs must agree on the
+length, and each line reports its speedup over the table where both ran.
+"""
+import argparse
+import random
+import time
+
+from longest_palindrome_subsequence import (longest_palindrome_length, longest_palindrome_length_bits,
+                                            return_longest_palindrome)
+
+ENGINES = {
+    'table': lambda s: len(return_longest_palindrome(s)),
+    'rows': longest_palindrome_length,
+    'bits': longest_palindrome_length_bits,
+}
+
+
+def random_text(n, alphabet="acgt", seed=0):
+    rng = random.Random(seed)
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def time_engine(engine, s, repeats):
+    # best of repeats, to keep other load on the machine out of the number; runs over a second are not repeated
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        length = ENGINES[engine](s)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        if seconds > 1:
+            break
+    return length, best
+
+
+def run(sizes, alphabet, table_limit, rows_limit, repeats):
+    limits = {'table': table_limit, 'rows': rows_limit, 'bits': None}
+    results = []
+    for n in sizes:
+        s = random_text(n, alphabet)
+        timings = {}
+        for engine, limit in limits.items():
+            if limit is not None and n > limit:
+                print(f"n={n:>7} {engine:>5}: skipped (over its limit of {limit})")
+                continue
+            length, seconds = time_engine(engine, s, repeats)
+            timings[engine] = (length, seconds)
+            speedup = ""
+            if engine != 'table' and 'table' in timings:
+                speedup = f", {timings['table'][1] / seconds:.0f}x the table"
+            print(f"n={n:>7} {engine:>5}: length {length}, {seconds:.4f}s{speedup}", flush=True)
+        if len({length for length, _ in timings.values()}) > 1:
+            raise AssertionError(f"Engines disagree on n={n}: {timings}")
+        results.append((n, timings))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the longest palindromic subsequence engines")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--alphabet', default="acgt")
+    parser.add_argument('--table-limit', type=int, default=10000, help="longest string given to the full table")
+    parser.add_argument('--rows-limit', type=int, default=100000, help="longest string given to the rolling rows")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per engine; the best counts")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.alphabet, args.table_limit, args.rows_limit, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Longest palindromic subsequence of any window s[start:stop] of one string.
+
+    index = PalindromeIndex(document)
+    index.length(100, 400)                          # O(1)
+    index.lengths([(0, 50), (10, 900), (7, 7)])     # many windows at once
+    index.palindrome(100, 400)                      # == return_longest_palindrome(document[100:400])
+
+dp[i, j] of the table return_longest_palindrome builds only depends on
+s[i..j], so the table of the whole string already holds the answer for
+every window: s[start:stop] is dp[start, stop - 1]. The index builds that
+table once and keeps only its upper triangle (i <= j), row after row in
+one flat array of the smallest unsigned type that holds len(s).
+"""
+import numpy as np
+
+from longest_palindrome_subsequence import palindrome_rows
+
+
+def length_dtype(n):
+    # Smallest unsigned type that holds every length up to n
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class PalindromeIndex:
+    def __init__(self, s):
+        # O(len(s) * len(s)) time once, len(s) * (len(s) + 1) / 2 cells of length_dtype(len(s))
+        self.text = s
+        n = self.n = len(s)
+        self.table = np.empty(n * (n + 1) // 2, dtype=length_dtype(n))
+        for i, row in palindrome_rows(s):
+            start = self.offset(i)
+            self.table[start:start + n - i] = row
+
+    def offset(self, i):
+        # Row i holds dp[i, i..n-1], after the n, n-1, ..., n-i+1 cells of the rows above it
+        return i * self.n - i * (i - 1) // 2
+
+    def cell(self, i, j):
+        # dp[i, j] for i <= j
+        return int(self.table[self.offset(i) + j - i])
+
+    def check(self, start, stop):
+        if not 0 <= start <= stop <= self.n:
+            raise ValueError(f"Window {start}:{stop} is not within a string of length {self.n}")
+
+    def length(self, start=0, stop=None):
+        # Length of the longest palindromic subsequence of s[start:stop]
+        stop = self.n if stop is None else stop
+        self.check(start, stop)
+        return 0 if start == stop else self.cell(start, stop - 1)
+
+    def lengths(self, ranges):
+        # length() of every (start, stop) row of ranges, looked up together
+        ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        starts, stops = ranges[:, 0], ranges[:, 1]
+        bad = (starts < 0) | (starts > stops) | (stops > self.n)
+        if bad.any():
+            start, stop = ranges[np.argmax(bad)]
+            self.check(int(start), int(stop))
+        # Empty windows stay 0, the rest are dp[start, stop - 1]
+        lengths = np.zeros(len(ranges), dtype=np.int64)
+        filled = starts < stops
+        starts, stops = starts[filled], stops[filled]
+        lengths[filled] = self.table[starts * self.n - starts * (starts - 1) // 2 + stops - 1 - starts]
+        return lengths
+
+    def palindrome(self, start=0, stop=None):
+        # The same palindrome return_longest_palindrome(s[start:stop]) gives, backtracked through the stored table
+        stop = self.n if stop is None else stop
+        self.check(start, stop)
+        if start == stop:
+            return ""
+        s = self.text
+        i, j = start, stop - 1
+        output = []
+        while i <= j:
+            if s[i] == s[j]:
+                output.append(s[i])
+                i += 1
+                j -= 1
+            elif self.cell(i, j - 1) > self.cell(i + 1, j):
+                j -= 1
+            else:
+                i += 1
+        left = "".join(output)
+        # An odd length ends on the middle character, which is not mirrored
+        if self.cell(start, stop - 1) % 2 != 0:
+            return left + left[::-1][1:]
+        return left + left[::-1]
@@ -0,0 +1,60 @@
+"""Longest palindromic subsequence of a string that keeps growing at the end.
+
+    stream = PalindromeStream()
+    for chunk in chunks:
+        print(stream.append(chunk))       # length of the LPS of everything so far
+
+    recent = PalindromeStream(window=10000)  # only the last 10000 characters count
+
+Appending s[j] only adds column j to return_longest_palindrome's table:
+dp[i, j] for every i <= j, from dp[i, j-1] (the column before) and dp[i+1, j]
+(the cell below in the new column). So only the last column is kept and
+each character costs O(len(s)) work, or O(window) with a window: dropping
+the oldest character only drops the column's top cell, since dp[i, j]
+depends on nothing left of s[i].
+"""
+import numpy as np
+
+from longest_palindrome_subsequence import char_codes, longest_palindrome
+
+
+class PalindromeStream:
+    def __init__(self, window=None):
+        if window is not None and window < 1:
+            raise ValueError(f"Window must be at least 1 character, got {window}")
+        self.window = window
+        self.text = ""
+        self.codes = np.zeros(0, dtype=np.uint32)
+        # column[i] is dp[i, last] for every i of text
+        self.column = np.zeros(0, dtype=np.int64)
+
+    def append(self, chunk):
+        # Add chunk's characters one column at a time and return the new length
+        codes = char_codes(chunk)
+        for code in codes:
+            self.add(code)
+        self.text += chunk
+        if self.window is not None:
+            self.text = self.text[-self.window:]
+        return self.length
+
+    def add(self, code):
+        if self.window is not None and len(self.codes) == self.window:
+            self.codes = self.codes[1:]
+            self.column = self.column[1:]
+        # Same recurrence as the rows, down a column: with the cell below dp[i+1, j] as the running term,
+        # dp[i, j] = max(dp[i+1, j-1] + 2 if s[i] == s[j], dp[i, j-1], dp[i+1, j])
+        before = np.append(self.column, 0)  # dp[i, j-1], with dp[j, j-1] = 0
+        candidates = np.maximum(before[:-1], np.where(self.codes == code, before[1:] + 2, 0))
+        candidates = np.append(candidates, 1)  # dp[j, j]
+        self.column = np.maximum.accumulate(candidates[::-1])[::-1]
+        self.codes = np.append(self.codes, code)
+
+    @property
+    def length(self):
+        # Length of the longest palindromic subsequence of text (the window, when there is one)
+        return int(self.column[0]) if len(self.column) else 0
+
+    def palindrome(self):
+        # The palindrome itself, from the DP over the kept text
+        return longest_palindrome(self.text)
@@ -81,9 +81,10 @@ def show_results(avg_completion, task_log):
 
     
     
-task_log = plan_tasks(task_names,task_process_times,potential_start_times)
-avg_completion = avg_completion_time(task_log,task_names)
-show_results(avg_completion,task_log)
+if __name__ == "__main__":
+    task_log = plan_tasks(task_names,task_process_times,potential_start_times)
+    avg_completion = avg_completion_time(task_log,task_names)
+    show_results(avg_completion,task_log)
 
 
 # Even though the complexity of this algorithm scales better than the dynamic approach would
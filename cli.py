@@ -0,0 +1,174 @@
+"""One command line for every algorithm in this repository.
+
+    python cli.py carve dory.png carved.png --seams 50
+    python cli.py batch-carve photos/ carved/ --size 800x600
+    python cli.py benchmark --sizes 256 512
+    python cli.py carve-video clip.gif carved/ --seams 40
+    python cli.py palindrome CHARACTER
+    python cli.py palindrome CHARACTER --length
+    python cli.py palindrome-benchmark --sizes 1000 10000
+    python cli.py inventory --months 12 --free 15
+    python cli.py inventory --scenarios 20000 --processes 4
+    python cli.py schedule --task a:3:6 --task b:9:2
+
+Each algorithm's module is imported only when its command runs, so this
+loads no NumPy, SciPy or Pillow before it knows what it needs.
+"""
+import argparse
+import importlib
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parent
+# Directory holding each algorithm's modules; they import their siblings by plain name
+SEAM_CARVING = ROOT / 'dynamic_programming' / 'Image_Compression_by_Seam_carving'
+PALINDROME = ROOT / 'Longest_Palindrome_Subsequence' / 'Python'
+INVENTORY = ROOT / 'inventory_planning'
+SCHEDULING = ROOT / 'Task_Scheduling'
+
+
+def load(directory: Path, module: str):
+    """Import module from directory, putting the directory on sys.path for its sibling imports"""
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+    return importlib.import_module(module)
+
+
+def carve(args: argparse.Namespace) -> None:
+    seam_carving = load(SEAM_CARVING, 'image_compression_by_seam_carving')
+    from PIL import Image
+
+    img_array = seam_carving.image_to_array(args.image)
+    carved = seam_carving.carve(img_array, args.seams, args.seams,
+                                low_memory=args.low_memory, workdir=args.workdir)
+    Image.fromarray(carved).save(args.output)
+    print(f"{img_array.shape[1]}x{img_array.shape[0]} -> {carved.shape[1]}x{carved.shape[0]}: {args.output}")
+
+
+def batch_carve(argv: List[str]) -> None:
+    load(SEAM_CARVING, 'batch_carve').main(argv)
+
+
+def benchmark(argv: List[str]) -> None:
+    load(SEAM_CARVING, 'benchmark').main(argv)
+
+
+def carve_video(argv: List[str]) -> None:
+    load(SEAM_CARVING, 'video_carving').main(argv)
+
+
+def palindrome_benchmark(argv: List[str]) -> None:
+    load(PALINDROME, 'lps_benchmark').main(argv)
+
+
+# Commands with a parser of their own, handed the rest of the command line untouched
+PASS_THROUGH = {
+    'batch-carve': (batch_carve, "seam carve a directory or glob of images (see batch_carve.py)"),
+    'benchmark': (benchmark, "benchmark the seam carving implementations (see benchmark.py)"),
+    'carve-video': (carve_video, "seam carve the frames of a clip (see video_carving.py)"),
+    'palindrome-benchmark': (palindrome_benchmark, "time the palindrome engines (see lps_benchmark.py)"),
+}
+
+
+def palindrome(args: argparse.Namespace) -> None:
+    lps = load(PALINDROME, 'longest_palindrome_subsequence')
+    if args.length:
+        print(lps.longest_palindrome_length_bits(args.text))
+    elif args.linear_memory:
+        print(lps.longest_palindrome_linear(args.text))
+    else:
+        print(lps.return_longest_palindrome(args.text))
+
+
+def inventory(args: argparse.Namespace) -> None:
+    if args.scenarios:
+        scenarios = load(INVENTORY, 'inventory_scenarios')
+        demand = scenarios.random_demand_matrix(args.scenarios, args.months, args.min_demand, args.max_demand,
+                                                args.seed)
+        results = scenarios.stream_scenarios(demand, args.free, processes=args.processes)
+        scenarios.print_statistics(scenarios.scenario_statistics(results))
+        return
+    planning = load(INVENTORY, 'inventory_planning')
+    demand = planning.random_demand(args.months, args.min_demand, args.max_demand, args.seed)
+    if args.solver == 'table':
+        planning.print_results(planning.fill_dp_matrix(args.months, args.free, demand))
+    elif args.solver == 'auto':
+        planning.print_plan(*load(INVENTORY, 'lot_sizing').plan_inventory(args.months, args.free, demand))
+    else:
+        planning.print_plan(*planning.plan_production(args.months, args.free, demand))
+
+
+def schedule(args: argparse.Namespace) -> None:
+    scheduling = load(SCHEDULING, 'task_scheduling')
+    if args.task:
+        names, process_times, start_times = zip(*args.task)
+    else:
+        names, process_times, start_times = (scheduling.task_names, scheduling.task_process_times,
+                                             scheduling.potential_start_times)
+    task_log = scheduling.plan_tasks(list(names), list(process_times), list(start_times))
+    scheduling.show_results(scheduling.avg_completion_time(task_log, list(names)), task_log)
+
+
+def parse_task(text: str):
+    """NAME:PROCESS_TIME:START_TIME, e.g. a:3:6"""
+    try:
+        name, process_time, start_time = text.split(':')
+        return name, int(process_time), int(start_time)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Task must look like a:3:6, got {text!r}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in PASS_THROUGH:
+        PASS_THROUGH[argv[0]][0](argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(description="Run one of the algorithms in this repository")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('carve', help="seam carve one image")
+    command.add_argument('image')
+    command.add_argument('output')
+    command.add_argument('--seams', type=int, required=True, help="vertical and horizontal seams to remove")
+    command.add_argument('--low-memory', action='store_true', help="float32 energy and DP tables")
+    command.add_argument('--workdir', help="keep the working arrays in temporary files here")
+    command.set_defaults(run=carve)
+
+    for name, (_, help_text) in PASS_THROUGH.items():
+        # Listed for --help only; main() dispatches these before parsing
+        commands.add_parser(name, help=help_text)
+
+    command = commands.add_parser('palindrome', help="longest palindromic subsequence of a string")
+    command.add_argument('text')
+    mode = command.add_mutually_exclusive_group()
+    mode.add_argument('--length', action='store_true', help="print only the length (bit-parallel)")
+    mode.add_argument('--linear-memory', action='store_true',
+                      help="reconstruct in O(n) memory instead of with the full n x n table")
+    command.set_defaults(run=palindrome)
+
+    command = commands.add_parser('inventory', help="cheapest production plan for random monthly demand")
+    command.add_argument('--months', type=int, default=12)
+    command.add_argument('--free', type=int, default=15, help="machines produced free each month")
+    command.add_argument('--min-demand', type=int, default=1)
+    command.add_argument('--max-demand', type=int, default=30)
+    command.add_argument('--seed', type=int, default=20)
+    command.add_argument('--solver', choices=('table', 'rows', 'auto'), default='table',
+                         help="fill_dp_matrix's full tables, plan_production's rolling rows and backpointers, "
+                              "or lot_sizing's fast paths where the costs allow them")
+    command.add_argument('--scenarios', type=int, help="solve this many random demand scenarios and summarise them")
+    command.add_argument('--processes', type=int, default=1, help="processes solving the scenarios")
+    command.set_defaults(run=inventory)
+
+    command = commands.add_parser('schedule', help="shortest-remaining-time task schedule")
+    command.add_argument('--task', type=parse_task, action='append',
+                         help="NAME:PROCESS_TIME:START_TIME, repeatable (default: the built-in example)")
+    command.set_defaults(run=schedule)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
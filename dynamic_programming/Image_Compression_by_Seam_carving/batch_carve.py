@@ -0,0 +1,186 @@
+"""Seam carve every image of a directory or glob on all cores.
+
+    python batch_carve.py photos/ carved/ --size 800x600
+    python batch_carve.py "photos/**/*.png" carved/ --seams 50 --workers 8
+
+Each image is carved in a worker process and written to the output
+directory as soon as it is done, at the same path relative to the output
+directory as it has below the source directory (or the glob's fixed part).
+Each output's --size/--seams go in a .carve.json file next to it; outputs
+newer than their input and carved with the same parameters are left alone
+unless --force is given.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from image_compression_by_seam_carving import carve
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+def source_root(source: Union[str, Path]) -> Path:
+    """Directory the images of source are found under: the directory itself, or a glob's fixed leading part"""
+    source = str(source)
+    if os.path.isdir(source):
+        return Path(source)
+    fixed = []
+    for part in Path(source).parts:
+        if glob.has_magic(part):
+            break
+        fixed.append(part)
+    return Path(*fixed) if fixed else Path('.')
+
+
+def output_paths(source: Union[str, Path], output_dir: Union[str, Path], images: List[Path]) -> List[Path]:
+    """Where each image goes: its path under source_root(source), repeated under output_dir"""
+    root = source_root(source)
+    return [Path(output_dir) / os.path.relpath(path, root) for path in images]
+
+
+def collect_images(source: Union[str, Path]) -> List[Path]:
+    """Image files directly inside a directory, or the matches of a glob pattern"""
+    source = str(source)
+    if os.path.isdir(source):
+        paths = Path(source).iterdir()
+    else:
+        paths = map(Path, glob.glob(source, recursive=True))
+    return sorted(path for path in paths if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def seam_counts(width: int, height: int, size: Optional[Tuple[int, int]] = None,
+                seams: Optional[int] = None) -> Tuple[int, int]:
+    """Vertical and horizontal seams to remove to reach size, or seams of each kind"""
+    if (size is None) == (seams is None):
+        raise ValueError("Give exactly one of size and seams")
+    if seams is not None:
+        return min(seams, width - 1), min(seams, height - 1)
+    target_width, target_height = size
+    if target_width < 1 or target_height < 1:
+        raise ValueError(f"Target size must be positive, got {target_width}x{target_height}")
+    return max(width - target_width, 0), max(height - target_height, 0)
+
+
+def carve_parameters(size: Optional[Tuple[int, int]] = None, seams: Optional[int] = None) -> dict:
+    """What an output was carved with, as stored next to it"""
+    return {'size': None if size is None else list(size), 'seams': seams}
+
+
+def parameters_path(output: Path) -> Path:
+    """Sidecar file holding the parameters output was carved with"""
+    return output.with_name(output.name + '.carve.json')
+
+
+def is_up_to_date(source: Path, output: Path, parameters: Optional[dict] = None) -> bool:
+    """Whether output exists, is at least as new as source and was carved with parameters"""
+    if not output.exists() or output.stat().st_mtime < source.stat().st_mtime:
+        return False
+    if parameters is None:
+        return True
+    try:
+        return json.loads(parameters_path(output).read_text()) == parameters
+    except (OSError, ValueError):
+        return False
+
+
+def carve_file(source: Path, output: Path, size: Optional[Tuple[int, int]] = None,
+               seams: Optional[int] = None) -> dict:
+    """Carve one image file into output; runs in a worker process"""
+    from PIL import Image
+    start = time.perf_counter()
+    img = Image.open(source)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    img_array = np.array(img)
+    height, width = img_array.shape[:2]
+    vertical_seams, horizontal_seams = seam_counts(width, height, size, seams)
+
+    carved = carve(img_array, vertical_seams, horizontal_seams)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(carved).save(output)
+    parameters_path(output).write_text(json.dumps(carve_parameters(size, seams)))
+    return {
+        'source': str(source),
+        'output': str(output),
+        'size': (width, height),
+        'carved_size': (carved.shape[1], carved.shape[0]),
+        'megapixels': width * height / 1e6,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def carve_directory(source: Union[str, Path], output_dir: Union[str, Path],
+                    size: Optional[Tuple[int, int]] = None, seams: Optional[int] = None,
+                    workers: Optional[int] = None, force: bool = False) -> List[dict]:
+    """Carve every image of source into output_dir across a pool of worker processes.
+
+    Prints a line per image as it finishes and a throughput summary at the
+    end. Returns one result dict per carved image; failed images carry an
+    'error' entry instead of timings.
+    """
+    seam_counts(1, 1, size, seams)  # fail early on bad arguments, not once per image
+    output_dir = Path(output_dir)
+    images = collect_images(source)
+    jobs = list(zip(images, output_paths(source, output_dir, images)))
+    parameters = carve_parameters(size, seams)
+    pending = [(path, output) for path, output in jobs if force or not is_up_to_date(path, output, parameters)]
+    skipped = len(jobs) - len(pending)
+    print(f"{len(jobs)} images, {skipped} up to date, carving {len(pending)}")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(carve_file, path, output, size, seams): path for path, output in pending}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'source': str(futures[future]), 'error': str(e)}
+                print(f"{futures[future]}: failed: {e}")
+            else:
+                (width, height), (new_width, new_height) = result['size'], result['carved_size']
+                print(f"{futures[future]}: {width}x{height} -> {new_width}x{new_height} "
+                      f"in {result['seconds']:.2f}s")
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    done = [result for result in results if 'error' not in result]
+    megapixels = sum(result['megapixels'] for result in done)
+    if done and elapsed > 0:
+        print(f"Carved {len(done)} images ({megapixels:.1f} MP) in {elapsed:.2f}s: "
+              f"{len(done) / elapsed:.2f} images/s, {megapixels / elapsed:.2f} MP/s")
+    return results
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    """WIDTHxHEIGHT, e.g. 800x600"""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Size must look like 800x600, got {text!r}")
+    return width, height
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Seam carve a directory or glob of images in parallel")
+    parser.add_argument('source', help="directory of images, or a glob such as 'photos/**/*.jpg'")
+    parser.add_argument('output_dir', help="directory the carved images are written to")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--size', type=parse_size, help="target size, WIDTHxHEIGHT")
+    target.add_argument('--seams', type=int, help="vertical and horizontal seams to remove from each image")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="carve images whose output is already up to date")
+    args = parser.parse_args(argv)
+    carve_directory(args.source, args.output_dir, size=args.size, seams=args.seams,
+                    workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
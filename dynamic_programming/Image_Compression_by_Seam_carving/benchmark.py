@@ -0,0 +1,250 @@
+"""Phase-by-phase benchmark of the seam carving implementations.
+
+    python benchmark.py                                  # every size, dory and factorio
+    python benchmark.py --sizes 256 1024 --seams 40 --output before.json
+    python benchmark.py --output after.json --compare before.json
+
+Every implementation carves the same images through its own entry point:
+root is the top-level Image_Compression_by_Seam_carving module (carve),
+dynamic this directory's image_compression_by_seam_carving.py (carve),
+test test.py (carve) and test2 test2.py (carve_seams, vertical then
+horizontal, one DP pass per batch). The phases come from the SeamEvents
+each loop reports to its observer (see carving_events); decode and encode
+are timed around the call and setup is whatever the call spends outside
+its events, such as the first energy map. backtrack is only split out of
+dp where the loop times it apart (dynamic and test). Synthetic images are
+seeded and test2's tie-breaking noise is seeded, so runs repeat exactly.
+
+Each case runs in a fresh process, so peak_rss_mb is that case's own peak
+(baseline_rss_mb is the process before the image is loaded). seam_energy is
+the summed energy of the removed pixels on each implementation's own map
+(the events' cost): a quality check within one implementation, not across
+them.
+"""
+import argparse
+import importlib.util
+import io
+import json
+import multiprocessing
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from carving_events import SeamEvent
+from workspace import peak_rss_mb
+
+IMPLEMENTATIONS = ('root', 'dynamic', 'test', 'test2')
+PHASES = ('decode', 'setup', 'energy', 'dp', 'backtrack', 'removal', 'encode')
+# The phases the carving loops report in their SeamEvents
+CARVING_PHASES = ('energy', 'dp', 'backtrack', 'removal')
+# Square synthetic sizes, then 4K UHD
+SYNTHETIC_SIZES = ((256, 256), (512, 512), (1024, 1024), (2048, 2048), (3840, 2160))
+BUNDLED_IMAGES = ('dory.png', 'factorio.png')
+HERE = Path(__file__).resolve().parent
+TOP_LEVEL = HERE.parent.parent / 'Image_Compression_by_Seam_carving' / 'image_compression_by_seam_carving.py'
+
+
+class PhaseTimer:
+    """Seconds spent in each named phase, summed over every entry; also the carving loops' observer"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.seam_energy = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def __call__(self, event: SeamEvent) -> None:
+        # The events' dp includes their backtrack, which is kept apart here
+        self.seconds['energy'] += event.energy
+        self.seconds['dp'] += event.dp - event.backtrack
+        self.seconds['backtrack'] += event.backtrack
+        self.seconds['removal'] += event.removal
+        self.seam_energy += event.cost
+
+    @contextmanager
+    def carving(self):
+        # Time a carving call, putting what its events do not account for under setup
+        reported = sum(self.seconds[phase] for phase in CARVING_PHASES)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds['setup'] += elapsed - (sum(self.seconds[phase] for phase in CARVING_PHASES) - reported)
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Seeded RGB test image: flat colour blocks of several sizes under mild noise"""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((height, width, 3))
+    for block in (128, 32, 8):
+        tiles = rng.random((-(-height // block), -(-width // block), 3))
+        img += np.kron(tiles, np.ones((block, block, 1)))[:height, :width]
+    img = img / 3 * 230 + rng.random((height, width, 3)) * 25
+    return img.astype(np.uint8)
+
+
+def carver(implementation: str) -> Callable:
+    """The implementation's entry point as carve(img, vertical_seams, horizontal_seams, observer=...)
+
+    Everything is imported here, so no import is timed as carving.
+    """
+    if implementation == 'root':
+        # Same module name as this directory's copy, so it is loaded from its path under another one
+        spec = importlib.util.spec_from_file_location('top_level_seam_carving', TOP_LEVEL)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        import scipy.ndimage  # noqa: F401, imported by its calculate_energy on first use
+        return module.carve
+    if implementation == 'dynamic':
+        from image_compression_by_seam_carving import carve
+        return carve
+    if implementation == 'test':
+        from test import carve
+        return carve
+    from test2 import carve_seams
+
+    def carve(img, vertical_seams, horizontal_seams, observer):
+        # As test2.compress_image: every vertical seam, then every horizontal one
+        img, _ = carve_seams(img, vertical_seams, axis=1, observer=observer)
+        img, _ = carve_seams(img, horizontal_seams, axis=0, observer=observer)
+        return img
+    return carve
+
+
+def run_case(implementation: str, image: str, seams: int) -> Dict:
+    """Carve one image with one implementation and measure it; runs in its own process.
+
+    image is a bundled file name or a synthetic WIDTHxHEIGHT size. seams is
+    split evenly between vertical and horizontal.
+    """
+    from PIL import Image
+    np.random.seed(0)
+    baseline = peak_rss_mb()
+    if image in BUNDLED_IMAGES:
+        encoded = (HERE / image).read_bytes()
+    else:
+        width, height = (int(part) for part in image.split('x'))
+        stream = io.BytesIO()
+        Image.fromarray(synthetic_image(width, height)).save(stream, format='PNG')
+        encoded = stream.getvalue()
+
+    carve = carver(implementation)
+    timer = PhaseTimer()
+    with timer.phase('decode'):
+        decoded = Image.open(io.BytesIO(encoded))
+        img = np.array(decoded.convert('RGB') if decoded.mode not in ('RGB', 'RGBA') else decoded)
+    height, width = img.shape[:2]
+    vertical_seams = min(seams // 2, width - 3)
+    horizontal_seams = min(seams - seams // 2, height - 3)
+
+    with timer.carving():
+        carved = carve(img, vertical_seams, horizontal_seams, observer=timer)
+    with timer.phase('encode'):
+        Image.fromarray(np.ascontiguousarray(carved)).save(io.BytesIO(), format='PNG')
+
+    removed = (width - carved.shape[1]) + (height - carved.shape[0])
+    carving = sum(timer.seconds[phase] for phase in ('setup',) + CARVING_PHASES)
+    return {
+        'implementation': implementation,
+        'image': image,
+        'width': width,
+        'height': height,
+        'seams': removed,
+        'phases': timer.seconds,
+        'seams_per_second': removed / carving if carving > 0 else None,
+        'seam_energy': timer.seam_energy,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline,
+    }
+
+
+def run_benchmark(implementations=IMPLEMENTATIONS, images: Optional[List[str]] = None,
+                  seams: int = 20) -> Dict:
+    """Every implementation on every image, one fresh process per case"""
+    if images is None:
+        images = [f"{width}x{height}" for width, height in SYNTHETIC_SIZES] + list(BUNDLED_IMAGES)
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for image in images:
+        for implementation in implementations:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (implementation, image, seams))
+            results.append(result)
+            print(format_result(result), flush=True)
+    return {'meta': environment(seams), 'results': results}
+
+
+def environment(seams: int) -> Dict:
+    """What a result file was measured on, for telling runs apart later"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': multiprocessing.cpu_count(),
+        'seams': seams,
+    }
+
+
+def format_result(result: Dict) -> str:
+    phases = ' '.join(f"{phase}={result['phases'][phase]:.3f}s" for phase in PHASES)
+    return (f"{result['implementation']:>7} {result['image']:>12}: {result['seams']} seams, "
+            f"{result['seams_per_second']:.1f} seams/s, peak {result['peak_rss_mb']:.0f} MiB, "
+            f"seam energy {result['seam_energy']:.4g} | {phases}")
+
+
+def compare(old: Dict, new: Dict) -> None:
+    """Print the seams/s and seam energy of new relative to old, case by case"""
+    previous = {(r['implementation'], r['image']): r for r in old['results']}
+    for result in new['results']:
+        before = previous.get((result['implementation'], result['image']))
+        if before is None or not before['seams_per_second']:
+            continue
+        speed = result['seams_per_second'] / before['seams_per_second']
+        energy = result['seam_energy'] / before['seam_energy'] if before['seam_energy'] else float('nan')
+        print(f"{result['implementation']:>7} {result['image']:>12}: {speed:.2f}x seams/s, "
+              f"{energy:.3f}x seam energy")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the seam carving implementations phase by phase")
+    parser.add_argument('--implementations', nargs='+', choices=IMPLEMENTATIONS, default=list(IMPLEMENTATIONS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=None,
+                        help="square synthetic sizes instead of the default 256 to 4K set")
+    parser.add_argument('--no-bundled', action='store_true', help="skip dory.png and factorio.png")
+    parser.add_argument('--seams', type=int, default=20, help="seams per image, half vertical, half horizontal")
+    parser.add_argument('--output', help="write the results here as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = SYNTHETIC_SIZES if args.sizes is None else [(size, size) for size in args.sizes]
+    images = [f"{width}x{height}" for width, height in sizes]
+    if not args.no_bundled:
+        images += list(BUNDLED_IMAGES)
+    report = run_benchmark(args.implementations, images, args.seams)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Rows moved per block when everything below a horizontal seam shifts up,
+# so the overlapping copy never needs a temporary bigger than this
+BLOCK_ROWS = 64
+
+
+class CarvingBuffer:
+    """Image (or energy map) carved in place inside the array it started in.
+
+    The array is allocated once at its original size. Removing a seam shifts
+    pixels left within their row (vertical seam) or up within their column
+    (horizontal seam) and shrinks the live region, which image exposes as a
+    view. The view is only valid until the next removal.
+    """
+
+    def __init__(self, array: np.ndarray, copy: bool = True):
+        self._buffer = np.array(array, copy=True) if copy else np.ascontiguousarray(array)
+        self.height, self.width = array.shape[:2]
+
+    @property
+    def image(self) -> np.ndarray:
+        return self._buffer[:self.height, :self.width]
+
+    def _rows(self) -> np.ndarray:
+        """Live region with every row flattened, so a pixel's channels travel together"""
+        return self._buffer[:self.height, :self.width].reshape(self.height, -1)
+
+    def remove_seam(self, seam: np.ndarray, axis: int = 1) -> None:
+        """Remove a vertical (axis=1, one column per row) or horizontal (axis=0) seam"""
+        if axis not in (0, 1):
+            raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+
+        buffer, width = self._buffer, self.width
+        if axis == 1:
+            for i, col in enumerate(seam):
+                buffer[i, col:width - 1] = buffer[i, col + 1:width]
+            self.width -= 1
+            return
+
+        rows = self._rows()
+        channels = rows.shape[1] // width
+        seam_rows = np.repeat(seam, channels)
+        top, bottom = int(seam.min()), int(seam.max())
+        # Between the seam's highest and lowest point only some columns move up
+        for i in range(top, bottom):
+            np.copyto(rows[i], rows[i + 1], where=seam_rows <= i)
+        # Below its lowest point every column does
+        for i in range(bottom, self.height - 1, BLOCK_ROWS):
+            stop = min(i + BLOCK_ROWS, self.height - 1)
+            rows[i:stop] = rows[i + 1:stop + 1]
+        self.height -= 1
+
+    def remove_seams(self, seams: np.ndarray, axis: int = 1) -> None:
+        """Remove a (seams, length) batch of pixel-disjoint seams in one pass"""
+        if axis not in (0, 1):
+            raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+
+        count = len(seams)
+        if axis == 1:
+            keep = np.ones((self.height, self.width), dtype=bool)
+            keep[np.arange(self.height), seams] = False
+            for i in range(self.height):
+                row = self._buffer[i, :self.width]
+                row[:self.width - count] = row[keep[i]]
+            self.width -= count
+            return
+
+        # One row-ordered pass for the whole batch. With the batch's rows in
+        # column j sorted, seam[0] < seam[1] < ..., output row i of the column
+        # comes from row i + shift, shift counting the k with seam[k] - k <= i.
+        # A block of rows no seam crosses is one shifted copy; one that seams
+        # cross is put together from a shifted copy per seam crossing it
+        if count == 0:
+            return
+        rows = self._rows()
+        channels = rows.shape[1] // self.width
+        ordered = np.sort(np.asarray(seams), axis=0) - np.arange(count)[:, None]
+        # Each column's rows repeated per channel, to match the flattened rows
+        ordered = np.repeat(ordered, channels, axis=1)
+        lowest, highest = ordered.min(axis=1), ordered.max(axis=1)
+        new_height = self.height - count
+        for first in range(int(lowest[0]), new_height, BLOCK_ROWS):
+            stop = min(first + BLOCK_ROWS, new_height)
+            passed = int(np.count_nonzero(highest <= first))
+            crossing = np.flatnonzero((highest > first) & (lowest < stop))
+            if crossing.size == 0:
+                if passed:
+                    rows[first:stop] = rows[first + passed:stop + passed]
+                continue
+            index = np.arange(first, stop, dtype=ordered.dtype)[:, None]
+            shift = np.full(rows[first:stop].shape, passed, dtype=np.int8 if count < 127 else np.intp)
+            for k in crossing:
+                shift += ordered[k] <= index
+            block = rows[first + passed:stop + passed].copy()
+            for k in range(passed + 1, passed + crossing.size + 1):
+                np.copyto(block, rows[first + k:stop + k], where=shift == k)
+            rows[first:stop] = block
+        self.height = new_height
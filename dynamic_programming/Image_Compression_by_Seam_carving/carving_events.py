@@ -0,0 +1,81 @@
+"""Per-seam events the carving loops report to an observer.
+
+An observer is any callable taking a SeamEvent. The carving entry points
+default to ignore(); PhaseHistogram aggregates the phase timings:
+
+    histogram = PhaseHistogram()
+    carve(img_array, 100, 100, observer=histogram)
+    print(histogram.report())
+"""
+import math
+from collections import Counter
+from typing import NamedTuple, Tuple
+
+PHASES = ('energy', 'dp', 'removal')
+
+
+class SeamEvent(NamedTuple):
+    """One iteration of a carving loop: which seams went and where the time went.
+
+    index counts the seams of direction removed before this iteration, and
+    seams how many this iteration removed (more than one for batched
+    loops). shape is the image's (height, width) afterwards. dp includes
+    backtracking, energy includes refreshing the map after the removal.
+    backtrack is the part of dp spent backtracking, for loops that time it
+    apart (0 otherwise), and cost the summed energy of the removed pixels
+    on the map they were found on.
+    """
+    index: int
+    direction: str
+    shape: Tuple[int, int]
+    energy: float
+    dp: float
+    removal: float
+    seams: int = 1
+    backtrack: float = 0.0
+    cost: float = 0.0
+
+
+def ignore(event: SeamEvent) -> None:
+    """The default observer: does nothing"""
+
+
+class PhaseHistogram:
+    """Observer that buckets every phase's durations by powers of two microseconds.
+
+    Bucket k holds durations from 2 ** k up to 2 ** (k + 1) microseconds;
+    anything under a microsecond goes to bucket 0.
+    """
+
+    def __init__(self):
+        self.buckets = {phase: Counter() for phase in PHASES}
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.events = 0
+        self.seams = 0
+
+    def __call__(self, event: SeamEvent) -> None:
+        self.events += 1
+        self.seams += event.seams
+        for phase in PHASES:
+            seconds = getattr(event, phase)
+            self.totals[phase] += seconds
+            self.buckets[phase][max(int(math.log2(seconds * 1e6)), 0) if seconds > 0 else 0] += 1
+
+    def report(self) -> str:
+        """Totals and the histogram of each phase, one bucket per line"""
+        lines = [f"{self.seams} seams in {self.events} iterations"]
+        for phase in PHASES:
+            lines.append(f"{phase}: {self.totals[phase]:.3f}s")
+            for bucket in sorted(self.buckets[phase]):
+                low, high = 2 ** bucket, 2 ** (bucket + 1)
+                lines.append(f"  {format_microseconds(low)}-{format_microseconds(high)}: "
+                             f"{self.buckets[phase][bucket]}")
+        return '\n'.join(lines)
+
+
+def format_microseconds(microseconds: float) -> str:
+    if microseconds >= 1e6:
+        return f"{microseconds / 1e6:g}s"
+    if microseconds >= 1e3:
+        return f"{microseconds / 1e3:g}ms"
+    return f"{microseconds:g}us"
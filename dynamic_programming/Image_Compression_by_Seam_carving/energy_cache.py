@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Callable, Optional
+
+from carving_buffer import CarvingBuffer
+from parallel_energy import strip_energy
+from workspace import work_array
+
+# After a vertical seam leaves row i, only new columns min(seam[i-1:i+2]) - 1
+# through max(seam[i-1:i+2]) see a different 3x3 neighbourhood. Neighbouring
+# seam entries differ by at most one, so that band is never wider than 4.
+BAND_WIDTH = 4
+# The band plus one halo column on each side for the filters to read
+WINDOW_WIDTH = BAND_WIDTH + 2
+
+
+def delete_seam(array: np.ndarray, seam: np.ndarray, axis: int = 1) -> np.ndarray:
+    """Drop array[i, seam[i]] from every row (axis=1) or array[seam[j], j] from every column (axis=0)"""
+    return delete_seams(array, seam[None], axis)
+
+
+def delete_seams(array: np.ndarray, seams: np.ndarray, axis: int = 1) -> np.ndarray:
+    """Drop every seam of a (seams, length) array of disjoint seams.
+
+    Vertical seams go with one mask compaction. Horizontal seams are carved
+    out of a copy row by row in memory order, so the result stays C-ordered
+    instead of being a transposed view.
+    """
+    if axis not in (0, 1):
+        raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+    if axis == 0:
+        buffer = CarvingBuffer(array)
+        buffer.remove_seams(seams, axis=0)
+        return buffer.image
+
+    height, width = array.shape[:2]
+    keep = np.ones((height, width), dtype=bool)
+    keep[np.arange(height), seams] = False
+    return array[keep].reshape((height, width - len(seams)) + array.shape[2:])
+
+
+def refresh_band(img_array: np.ndarray, local_map: np.ndarray, seam: np.ndarray,
+                 local_energy: Callable[[np.ndarray], np.ndarray]) -> None:
+    """Recompute local_map in place around a vertical seam that was just removed.
+
+    img_array and local_map are already one column narrower, seam holds the
+    removed columns in the old coordinates. Interior rows are gathered as
+    3-row patches and stacked into one tall image, so local_energy runs once
+    over an (3 * height, WINDOW_WIDTH) array instead of once per row, and
+    only the centre row of every patch is kept. The first and last rows keep
+    their real top/bottom edge, so edge handling matches a full call.
+    """
+    height, width = img_array.shape[:2]
+    if height < 3 or width < WINDOW_WIDTH:
+        local_map[...] = local_energy(img_array)
+        return
+
+    padded = np.concatenate(([seam[0]], seam, [seam[-1]]))
+    lowest = np.minimum(np.minimum(padded[:-2], padded[1:-1]), padded[2:])
+    band_start = np.clip(lowest - 1, 0, width - BAND_WIDTH)
+    window_start = np.clip(band_start - 1, 0, width - WINDOW_WIDTH)
+
+    fresh = np.empty((height, WINDOW_WIDTH) + local_map.shape[2:], dtype=local_map.dtype)
+    first, last = window_start[0], window_start[-1]
+    fresh[0] = local_energy(img_array[:2, first:first + WINDOW_WIDTH])[0]
+    fresh[-1] = local_energy(img_array[-2:, last:last + WINDOW_WIDTH])[-1]
+
+    rows = np.arange(1, height - 1)[:, None] + np.arange(-1, 2)
+    cols = window_start[1:-1, None] + np.arange(WINDOW_WIDTH)
+    patches = img_array[rows[:, :, None], cols[:, None, :]]
+    stacked = patches.reshape((3 * (height - 2), WINDOW_WIDTH) + img_array.shape[2:])
+    fresh[1:-1] = local_energy(stacked)[1::3]
+
+    all_rows = np.arange(height)[:, None]
+    offsets = np.arange(BAND_WIDTH)
+    local_map[all_rows, band_start[:, None] + offsets] = \
+        fresh[all_rows, (band_start - window_start)[:, None] + offsets]
+
+
+class EnergyCache:
+    """Energy map kept in step with the image it was computed from.
+
+    local_energy gives every pixel a value that depends only on its 3x3
+    neighbourhood (scipy's reflect boundary and np.gradient's one-sided edges
+    are both fine); it may return extra trailing planes. combine, if given,
+    turns the cached local map into the final energy map and may be global,
+    e.g. a min/max normalisation. energy is always bit-identical to
+    combine(local_energy(image)) on the current image.
+
+    Image and local map are each carved in place in a CarvingBuffer, so a
+    whole carving run allocates them once. image, local_map and (without
+    combine) energy are views that stay valid until the next remove_seam.
+
+    dtype stores the local map in a narrower type than local_energy returns
+    (e.g. float32), and directory backs image and map with temporary files
+    there (see work_array). Either way the map is filled strip by strip, so
+    no full-size map of local_energy's own dtype is made.
+    """
+
+    def __init__(self, img_array: np.ndarray,
+                 local_energy: Callable[[np.ndarray], np.ndarray],
+                 combine: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 dtype=None, directory: Optional[str] = None):
+        self.local_energy = local_energy
+        self.combine = combine
+        image = work_array(img_array.shape, img_array.dtype, directory)
+        image[...] = img_array
+        self._image = CarvingBuffer(image, copy=False)
+        if dtype is None and directory is None:
+            local_map = local_energy(img_array)
+        else:
+            # A few rows give the map's trailing shape and dtype without a full-size call
+            sample = local_energy(img_array[:3])
+            local_map = work_array(img_array.shape[:2] + sample.shape[2:], dtype or sample.dtype, directory)
+            strip_energy(local_energy, img_array, out=local_map)
+        self._local_map = CarvingBuffer(local_map, copy=False)
+
+    @property
+    def image(self) -> np.ndarray:
+        return self._image.image
+
+    @property
+    def local_map(self) -> np.ndarray:
+        return self._local_map.image
+
+    @property
+    def energy(self) -> np.ndarray:
+        if self.combine is None:
+            return self.local_map
+        return self.combine(self.local_map)
+
+    def remove_seam(self, seam: np.ndarray, axis: int = 1) -> None:
+        """Remove a vertical (axis=1) or horizontal (axis=0) seam from image and map"""
+        self.cut(seam, axis)
+        self.refresh(seam, axis)
+
+    def cut(self, seam: np.ndarray, axis: int = 1) -> None:
+        """First half of remove_seam: take the seam out of image and map, recomputing nothing"""
+        if axis not in (0, 1):
+            raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+
+        self._image.remove_seam(seam, axis)
+        self._local_map.remove_seam(seam, axis)
+
+    def refresh(self, seam: np.ndarray, axis: int = 1) -> None:
+        """Second half of remove_seam: recompute the map next to the seam cut() just took out"""
+        if axis not in (0, 1):
+            raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+
+        if axis == 1:
+            refresh_band(self.image, self.local_map, seam, self.local_energy)
+        else:
+            # Run the energy on patches turned back upright so axis-specific filters see the real layout
+            refresh_band(self.image.swapaxes(0, 1), self.local_map.swapaxes(0, 1), seam,
+                         lambda patch: self.local_energy(patch.swapaxes(0, 1)).swapaxes(0, 1))
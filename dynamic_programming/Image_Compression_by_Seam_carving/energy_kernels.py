@@ -0,0 +1,146 @@
+"""Energy terms computed over all colour channels at once.
+
+The per-channel versions ran scipy's sobel once per channel and axis, each
+into a new full-size array and, on uint8 images, in uint8: gradients above
+255 wrapped around. Here the separable Sobel filters run once over the
+whole (height, width, 3) stack in int16 (wide enough for any uint8 image),
+the magnitudes in float32, and every temporary comes from a per-thread pool
+that later calls reuse.
+
+    rgb_sum_energy(img)       # sum of the channels' Sobel magnitudes
+    luminance_energy(img)     # the same, weighted 0.299 / 0.587 / 0.114
+    gradient_l1(img)          # |d/dx| + |d/dy| per channel, like np.gradient
+"""
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+LUMINANCE_WEIGHTS = (0.299, 0.587, 0.114)
+
+_pool = threading.local()
+
+
+def scratch(name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """Uninitialised buffer for name, carved out of one array this thread keeps per name and dtype.
+
+    The array only grows, so carving's ever smaller images and small
+    refresh patches all reuse the first full-size allocation. Per thread,
+    because strip_energy runs the kernels on several strips at once.
+    """
+    buffers = getattr(_pool, 'buffers', None)
+    if buffers is None:
+        buffers = _pool.buffers = {}
+    key = (name, np.dtype(dtype))
+    size = int(np.prod(shape))
+    buffer = buffers.get(key)
+    if buffer is None or buffer.size < size:
+        buffer = buffers[key] = np.empty(size, dtype=dtype)
+    return buffer[:size].reshape(shape)
+
+
+def work_dtype(dtype):
+    """Exact type for Sobel sums of an image type: int16 for 8-bit, int32 for 16-bit, else float"""
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'ui' and dtype.itemsize == 1:
+        return np.int16
+    if dtype.kind in 'ui' and dtype.itemsize == 2:
+        return np.int32
+    return np.float32 if dtype == np.float32 else np.float64
+
+
+def padded_channels(img_array: np.ndarray, dtype) -> np.ndarray:
+    """The first three channels in dtype, with one mirrored cell on every side (scipy's 'reflect' mode)"""
+    height, width = img_array.shape[:2]
+    padded = scratch('padded', (height + 2, width + 2, 3), dtype)
+    padded[1:-1, 1:-1] = img_array[:, :, :3]
+    padded[0, 1:-1], padded[-1, 1:-1] = padded[1, 1:-1], padded[-2, 1:-1]
+    padded[:, 0], padded[:, -1] = padded[:, 1], padded[:, -2]
+    return padded
+
+
+def sobel_magnitudes(img_array: np.ndarray, dtype=np.float32) -> np.ndarray:
+    """hypot(sobel(axis=0), sobel(axis=1)) of each channel, as a pooled (height, width, 3) buffer.
+
+    Equal to scipy's per-channel result on the image converted to float
+    first; the buffer is overwritten by this thread's next call.
+    """
+    height, width = img_array.shape[:2]
+    work = work_dtype(img_array.dtype)
+    padded = padded_channels(img_array, work)
+
+    # Difference along one axis, then 1-2-1 smoothing along the other
+    across = scratch('across', (height, width + 2, 3), work)
+    np.subtract(padded[2:], padded[:-2], out=across)
+    along_rows = scratch('along_rows', (height, width, 3), work)
+    np.add(across[:, :-2], across[:, 2:], out=along_rows)
+    along_rows += across[:, 1:-1]
+    along_rows += across[:, 1:-1]
+
+    down = scratch('down', (height + 2, width, 3), work)
+    np.subtract(padded[:, 2:], padded[:, :-2], out=down)
+    along_columns = scratch('along_columns', (height, width, 3), work)
+    np.add(down[:-2], down[2:], out=along_columns)
+    along_columns += down[1:-1]
+    along_columns += down[1:-1]
+
+    magnitude = scratch('magnitude', (height, width, 3), dtype)
+    square = scratch('square', (height, width, 3), dtype)
+    np.multiply(along_rows, along_rows, out=magnitude, dtype=dtype)
+    np.multiply(along_columns, along_columns, out=square, dtype=dtype)
+    magnitude += square
+    return np.sqrt(magnitude, out=magnitude)
+
+
+def weighted_energy(img_array: np.ndarray, weights: Optional[Sequence[float]] = None,
+                    dtype=np.float32, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sum of the channels' Sobel magnitudes, each times its weight (all 1 without weights)"""
+    magnitude = sobel_magnitudes(img_array, dtype)
+    if out is None:
+        out = np.empty(img_array.shape[:2], dtype=dtype)
+    if weights is None:
+        np.add(magnitude[:, :, 0], magnitude[:, :, 1], out=out)
+        out += magnitude[:, :, 2]
+        return out
+    term = scratch('term', img_array.shape[:2], dtype)
+    np.multiply(magnitude[:, :, 0], weights[0], out=out)
+    for channel in (1, 2):
+        out += np.multiply(magnitude[:, :, channel], weights[channel], out=term)
+    return out
+
+
+def rgb_sum_energy(img_array: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sobel magnitude summed over R, G and B (the root module's energy)"""
+    return weighted_energy(img_array, None, out=out)
+
+
+def luminance_energy(img_array: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sobel magnitude weighted by each channel's share of luminance (test.py's and test2.py's)"""
+    return weighted_energy(img_array, LUMINANCE_WEIGHTS, out=out)
+
+
+def gradient_l1(img_array: np.ndarray, dtype=np.float32, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """|np.gradient(axis=1)| + |np.gradient(axis=0)| of each of the first three channels, in one pass.
+
+    Central differences inside, one-sided ones on the edges, as np.gradient
+    takes them; the image needs at least two rows and two columns.
+    """
+    height, width = img_array.shape[:2]
+    if height < 2 or width < 2:
+        raise ValueError("Shape of array too small to calculate a numerical gradient")
+    channels = scratch('channels', (height, width, 3), dtype)
+    channels[...] = img_array[:, :, :3]
+    if out is None:
+        out = np.empty((height, width, 3), dtype=dtype)
+    step = scratch('step', (height, width, 3), dtype)
+
+    for axis, target in ((1, out), (0, step)):
+        source = np.moveaxis(channels, axis, 0)
+        result = np.moveaxis(target, axis, 0)
+        np.subtract(source[2:], source[:-2], out=result[1:-1])
+        result[1:-1] *= 0.5
+        np.subtract(source[1], source[0], out=result[0])
+        np.subtract(source[-1], source[-2], out=result[-1])
+    np.abs(out, out=out)
+    out += np.abs(step, out=step)
+    return out
@@ -1,101 +1,44 @@
 import numpy as np
-from scipy.ndimage import sobel
-from PIL import Image
+from seam_dp import find_vertical_seam, find_horizontal_seam, seam_cost, SeamFinder
+from energy_cache import EnergyCache, delete_seam
+from parallel_energy import strip_energy
+from energy_kernels import rgb_sum_energy
+from workspace import peak_rss_mb
+from carving_events import SeamEvent, ignore, PhaseHistogram
+from time import perf_counter
 
 def image_to_array(image_path):
+    # A saved .npy array is mapped from disk rather than read, so it can be larger than memory
+    if str(image_path).endswith('.npy'):
+        return np.load(image_path, mmap_mode='r')
     # Open the image and convert it to an array
+    # Pillow is imported where it is used, so importing this module stays cheap
+    from PIL import Image
     img = Image.open(image_path)
     img_array = np.array(img)
     return img_array
 
-def calculate_energy(img_array):
-    # Calculate the energy map by finding the Sobel gradient for each RGB channel
-    energy_map = np.zeros((img_array.shape[0], img_array.shape[1]))
+def calculate_energy(img_array, threads=None):
+    # Large images are cut into strips that run on a thread pool, with the same result as one serial pass
+    # threads=None picks all cores above a size threshold and a single pass below it
+    return strip_energy(sobel_energy, img_array, threads)
 
-    for channel in range(3):  # For R, G, B channels
-        sobel_x = sobel(img_array[:, :, channel], axis=0)  # Horizontal gradient
-        sobel_y = sobel(img_array[:, :, channel], axis=1)  # Vertical gradient
-        energy_map += np.hypot(sobel_x, sobel_y)  # Combine gradients for energy map
-    return energy_map
+def sobel_energy(img_array):
+    # Calculate the energy map by finding the Sobel gradient for each RGB channel and summing the magnitudes
+    # All three channels are filtered at once in int16, so strong edges no longer wrap around as they did in uint8
+    return rgb_sum_energy(img_array)
 
 def vertical_seam(array):
-    # Initialize a DP array to store the minimum energy cost to reach each pixel
-    i, j = array.shape
-    dp = np.zeros((i, j))
-    # Set the bottom row of the DP array to the energy map's bottom row values
-    dp[-1, :] = array[-1, :]
-    # Fill DP table from bottom to top to find minimum seam cost
-    for row in range(i-2, -1, -1):
-        for col in range(j):
-            # Calculate minimum energy for each possible move
-            min_prev = dp[row + 1, col] #direct up will always be possible
-            if col > 0:
-                min_prev = min(min_prev, dp[row + 1, col - 1]) #if not at left edge then check for left-down case vs current min
-            if col < j - 1:    
-                min_prev = min(min_prev, dp[row + 1, col + 1]) #if not at right edge then check for right-down case vs current min
-           #add the min path we found to the distruction value at the current cell and add it to the current dp matrix cell (total disruption up to this point)
-            dp[row, col] = array[row, col] + min_prev 
-    # Backtrack to find the optimal seam path
-    seam_cells = []
-    col = np.argmin(dp[0,:])  # Starting point with minimum energy in the top row
-    seam_cells.append((0, col))                
-    # For each row, track the path by moving to the minimum energy column in the next row
-    for row in range(1,i):
-        if col == j-1:
-            if dp[row,col-1] < dp[row,col]:
-                col-=1
-        elif col == 0:
-            if dp[row,col+1] < dp[row,col]:
-                col+=1
-        elif col > 0 and col < j-1:
-            if dp[row,col-1] < dp[row,col] and dp[row,col-1] < dp[row,col+1]:
-                col-=1
-            elif dp[row,col+1] < dp[row,col] and dp[row,col+1] < dp[row,col-1]:
-                col+=1
-        seam_cells.append([row,col])
-    return seam_cells
+    # The DP table is filled a whole row at a time by seam_dp, see cumulative_energy
+    # for how ties between the three cells above are broken
+    seam = find_vertical_seam(array)
+    # Keep returning (row, col) cells so remove_vertical_seam can walk them
+    return [[row, col] for row, col in enumerate(seam)]
 
 def horizontal_seam(array):
-    i, j = array.shape
-    dp = np.zeros((i,j))
-    # set left side of dp matrix to energy map's left side values (j = 0)
-    dp[ : , 0] = array[ : , 0]
-    # Now fill in the DP matrix from left to right
-    for column in range(1, j - 1):
-        #for each column (left to right, skipping previously filled in first), go through each row, top to bottom
-        for row in range(0, i-1):
-            #we can always go straight to the right so lets set min_prev to that first
-            min_prev = dp[row,column+1] 
-            #check if not at top of table (then we can go right-up)
-            if row > 0: 
-                min_prev = min(min_prev, dp[row-1,column+1])
-            #check if not at bottom of table (then we can go right-down)
-            if row < i - 1:
-                min_prev = min(min_prev, dp[row+1,column+1])
-            #now add the min prev to the distruction at the current pixel and put this in the curr cell of the dp matrix
-            #this is the total disruption up to this cell
-            dp[row,column] = array[row, column] + min_prev
-    #once the matrix is filled in, the ideal starting pixel will be the cell with the smallest value in the last column
-    start_row = np.argmin(dp[:, j-1])
-    #lets make an array to keep track of ideal seam's pixels to delete later
-    seam_cells = []
-    # put the optimal start_cell in the seam_cell array 
-    seam_cells.append([start_row, j-1])
-    #move from second to last column down to the first following ideal path from start pixel
-    for col in range(j-2,0,-1):
-        if row == 0:
-            if dp[row+1,col] < dp[row,col]:
-                row+=1
-        elif row==i-1:
-            if dp[row-1,col] < dp[row,col]:
-                row-=1
-        elif row > 0 and row < i-1:
-            if dp[row-1,col] < dp[row,col] and dp[row-1,col] < dp[row+1,col]:
-                row-=1
-            elif dp[row+1,col] < dp[row,col] and dp[row+1, col] < dp[row-1,col]:
-                row+=1
-        seam_cells.append([row,col])
-    return seam_cells
+    # A horizontal seam is a vertical seam of the transposed energy map, one row index per column
+    seam = find_horizontal_seam(array)
+    return [[row, col] for col, row in enumerate(seam)]
 
 def remove_vertical_seam(img_array, seam_cells):
     # Create a new array with one less column for the compressed image
@@ -107,31 +50,72 @@ def remove_vertical_seam(img_array, seam_cells):
     return new_img_array
 
 def remove_horizontal_seam(img_array, seam_cells):
-    # Create new array with one less row for the compressed image
-    new_img_array = np.zeros((img_array.shape[0] - 1, img_array.shape[1], img_array.shape[2]), dtype=img_array.dtype)
-    # for each column, remove the pixel in the seam
+    # Row of the seam in every column, then drop those cells row by row in memory order
+    seam = np.empty(img_array.shape[1], dtype=np.intp)
     for row, col in seam_cells:
-        new_img_array[:row, col] = img_array[:row, col] #copy all pixels up to seam
-        new_img_array[row:, col] = img_array[row + 1:, col] #skip seam cell and copy the rest
-    return new_img_array
+        seam[col] = row
+    return delete_seam(img_array, seam, axis=0)
+
+def carve(img_array, vertical_seams, horizontal_seams, observer=ignore, low_memory=False, workdir=None):
+    # Remove the seams one vertical, one horizontal at a time while both kinds remain, and return the carved array
+    # observer gets a SeamEvent with the shape and phase timings after every seam, see carving_events
+    # The energy map follows the image, only the few columns (rows) next to each removed seam are recomputed
+    # low_memory keeps the energy map and DP tables in float32, half their usual size, and workdir
+    # puts them and the image in temporary files there so the OS can page them out
+    dtype = np.float32 if low_memory else np.float64
+    cache = EnergyCache(img_array, calculate_energy, dtype=dtype if low_memory else None, directory=workdir)
+    # Each finder keeps its DP table and only redoes the part the removed seams disturbed
+    vertical_finder = SeamFinder(axis=1, dtype=dtype, directory=workdir)
+    horizontal_finder = SeamFinder(axis=0, dtype=dtype, directory=workdir)
+    for i in range(max(vertical_seams, horizontal_seams)):
+        if i < vertical_seams:
+            # remove vertical seam
+            observer(carve_step(cache, vertical_finder, horizontal_finder, i, axis=1))
+        if i < horizontal_seams:
+            # now remove horizontal seam
+            observer(carve_step(cache, vertical_finder, horizontal_finder, i, axis=0))
+    return cache.image
+
+def carve_step(cache, vertical_finder, horizontal_finder, index, axis):
+    # Remove one seam along axis and time each phase of it
+    start = perf_counter()
+    energy_map = cache.energy
+    finder = vertical_finder if axis == 1 else horizontal_finder
+    finder.update(energy_map)
+    filled = perf_counter()
+    seam = finder.backtrack()  # Find optimal seam based on energy map
+    cost = seam_cost(energy_map, seam, axis)
+    backtracked = perf_counter()
+    vertical_finder.seam_removed(seam, axis=axis)
+    horizontal_finder.seam_removed(seam, axis=axis)
+    found = perf_counter()
+    cache.cut(seam, axis=axis)  # Remove the optimal seam from the image and its energy map
+    cut = perf_counter()
+    cache.refresh(seam, axis=axis)  # and recompute the energy next to it
+    refreshed = perf_counter()
+    return SeamEvent(index, 'vertical' if axis == 1 else 'horizontal', cache.image.shape[:2],
+                     energy=refreshed - cut, dp=found - start, removal=cut - found,
+                     backtrack=backtracked - filled, cost=cost)
 
-def compression(num_reductions, img_path):
+def print_peak_rss(label):
+    peak = peak_rss_mb()
+    print("Peak memory " + label + ": " + ("unknown" if peak is None else f"{peak:.0f} MiB"))
+
+def compression(num_reductions, img_path, low_memory=False, workdir=None, observer=ignore):
     # Convert image to array and apply seam carving for the specified number of reductions
+    # See carve for observer, low_memory and workdir; a .npy img_path is never read into memory whole
     img_array = image_to_array(img_path)
-    for i in range(num_reductions):
-        # remove vertical seam
-        energy_map = calculate_energy(img_array)  # Generate energy map
-        seam = vertical_seam(energy_map)  # Find optimal seam based on energy map
-        img_array = remove_vertical_seam(img_array, seam)  # Remove the optimal seam
-        # now remove horizontal seam
-        energy_map = calculate_energy(img_array)
-        seam = horizontal_seam(energy_map)
-        img_array = remove_horizontal_seam(img_array, seam)
-        print(str(i+1) + "/" + str(num_reductions))
+    print_peak_rss("before carving")
+    img_array = carve(img_array, num_reductions, num_reductions, observer=observer,
+                      low_memory=low_memory, workdir=workdir)
+    print_peak_rss("after carving")
     # Save the compressed image after all seams are removed
-    result_img = Image.fromarray(img_array)
+    from PIL import Image
+    result_img = Image.fromarray(np.asarray(img_array))
     result_img.save("compressed_image.jpg")
 
 
-
-compression(260, "factorio.png")
+if __name__ == "__main__":
+    histogram = PhaseHistogram()
+    compression(260, "factorio.png", observer=histogram)
+    print(histogram.report())
@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+# Below this many pixels the pool costs more than the threads save
+AUTO_MIN_PIXELS = 1_000_000
+# Rows each strip reads beyond its own on either side, enough for 3x3 filters
+HALO = 1
+# Most rows per strip when writing into a given map, bounding the full-precision temporaries
+OUT_STRIP_ROWS = 256
+
+
+def resolve_threads(threads: Optional[int], pixels: int) -> int:
+    """Thread count to use: threads as given, or for None/0 all cores above AUTO_MIN_PIXELS and 1 below"""
+    if threads is None or threads == 0:
+        return (os.cpu_count() or 1) if pixels >= AUTO_MIN_PIXELS else 1
+    if threads < 0:
+        raise ValueError(f"Thread count must be positive or 0/None for auto, got {threads}")
+    return threads
+
+
+def strip_energy(local_energy: Callable[[np.ndarray], np.ndarray], img_array: np.ndarray,
+                 threads: Optional[int] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """local_energy(img_array), computed over horizontal strips on a thread pool.
+
+    local_energy must give every pixel a value that depends only on its 3x3
+    neighbourhood, with the image's own top and bottom rows handled as edges
+    (scipy's sobel and np.gradient both qualify). Every strip is run with a
+    HALO-row margin from its neighbours and the margin rows are dropped, so
+    the result is bit-identical to the serial call. NumPy and SciPy release
+    the GIL inside their loops, so the strips run on separate cores.
+
+    With out, every strip is written into it (cast to out's dtype, e.g. a
+    float32 memmap) and returned; the image is then cut into strips of at
+    most OUT_STRIP_ROWS rows even on one thread, so no full-size map of
+    local_energy's own dtype is ever made.
+    """
+    height = img_array.shape[0]
+    threads = min(resolve_threads(threads, height * img_array.shape[1]), max(height // (4 * HALO + 1), 1))
+    strips = threads if out is None else max(threads, -(-height // OUT_STRIP_ROWS))
+    if strips <= 1:
+        if out is None:
+            return local_energy(img_array)
+        out[...] = local_energy(img_array)
+        return out
+
+    bounds = np.linspace(0, height, strips + 1).astype(int)
+
+    def strip(index: int) -> Optional[np.ndarray]:
+        top, bottom = bounds[index], bounds[index + 1]
+        first, last = max(top - HALO, 0), min(bottom + HALO, height)
+        energy = local_energy(img_array[first:last])[top - first:bottom - first]
+        if out is None:
+            return energy
+        # Written straight away, so only the strips in flight are held at full precision
+        out[top:bottom] = energy
+        return None
+
+    if threads <= 1:
+        strips_done = [strip(index) for index in range(strips)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            strips_done = list(pool.map(strip, range(strips)))
+    return out if out is not None else np.concatenate(strips_done)
@@ -0,0 +1,196 @@
+"""Cache of carving results, keyed by image content and parameters.
+
+    cache = ResultCache(directory="carve-cache")
+    image = cached_compress_image("dory.png", 120, cache=cache)   # carves
+    image = cached_compress_image("dory.png", 120, cache=cache)   # from memory
+    cache.counters  # {'memory_hits': 1, 'disk_hits': 0, 'misses': 1, ...}
+
+Results live in a least-recently-used memory tier and, with a directory,
+in a disk tier of .npy files that outlives the process. Both tiers are
+capped in bytes and evict their least recently used entries.
+
+compress_image breaks ties between equal seams with np.random noise, so
+a carve that misses the cache runs with the noise seeded by TIE_SEED (and
+np.random's state put back afterwards): a cached result is the one a
+fresh carve of the same image and parameters gives, not whichever random
+tie-break happened to be cached first.
+"""
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+
+from test2 import compress_image
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Bytes hashed at a time when reading an image file
+HASH_CHUNK = 1 << 20
+# Parameters that do not change the result, left out of cache keys
+NON_SEMANTIC = frozenset({'observer'})
+# Seed of compress_image's tie-breaking noise for the carves the cache stores
+TIE_SEED = 0
+
+
+def content_digest(source: Union[str, Path, np.ndarray]) -> str:
+    """SHA-256 of an image file's bytes, or of an array's shape, dtype and pixels"""
+    digest = hashlib.sha256()
+    if isinstance(source, np.ndarray):
+        digest.update(f"{source.shape}{source.dtype.str}".encode())
+        digest.update(np.ascontiguousarray(source).data)
+        return digest.hexdigest()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(function, source: Union[str, Path, np.ndarray], *args, **kwargs) -> str:
+    """Key of function(source, *args, **kwargs): content digest plus every parameter, defaults filled in.
+
+    Passing a parameter by position, by keyword or not at all (when it has
+    its default value) gives the same key. NON_SEMANTIC parameters are left
+    out, and other callables count by module and qualified name, so keys
+    are the same in every process.
+    """
+    bound = inspect.signature(function).bind(source, *args, **kwargs)
+    bound.apply_defaults()
+    params = {name: value for name, value in bound.arguments.items()
+              if name != next(iter(bound.arguments)) and name not in NON_SEMANTIC}
+    text = json.dumps({'function': function.__name__, 'params': params}, sort_keys=True, default=key_text)
+    return hashlib.sha256((content_digest(source) + text).encode()).hexdigest()
+
+
+def key_text(value) -> str:
+    """Stable text for a parameter JSON cannot encode: callables by module and name, anything else by str()"""
+    if callable(value) and hasattr(value, '__qualname__'):
+        return f"{getattr(value, '__module__', '')}.{value.__qualname__}"
+    return str(value)
+
+
+class ResultCache:
+    """Two-tier LRU cache of result arrays: memory, then an optional directory on disk.
+
+    counters counts memory_hits, disk_hits, misses, memory_evictions and
+    disk_evictions. Disk entries are ranked by modification time, which a
+    hit refreshes, so the ranking survives restarts.
+    """
+
+    def __init__(self, memory_bytes: int = 256 << 20, directory: Optional[Union[str, Path]] = None,
+                 disk_bytes: int = 2 << 30):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = None if directory is None else Path(directory)
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self.counters = dict.fromkeys(
+            ('memory_hits', 'disk_hits', 'misses', 'memory_evictions', 'disk_evictions'), 0)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + '.npy')
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Cached array for key, or None; a disk hit is promoted to memory"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            return self._memory[key]
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                array = np.load(path)
+            except (FileNotFoundError, ValueError):
+                pass
+            else:
+                # Read-only like the arrays put() stores, so a caller cannot change the cached entry
+                array.flags.writeable = False
+                os.utime(path)
+                self.counters['disk_hits'] += 1
+                self._remember(key, array)
+                return array
+        self.counters['misses'] += 1
+        return None
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        """Store array under key in both tiers, evicting old entries past the caps"""
+        array = np.array(array)
+        array.flags.writeable = False
+        self._remember(key, array)
+        if self.directory is not None:
+            path = self._path(key)
+            # Written under a temporary name first, so readers never see half a file
+            partial = path.with_name(path.name + '.partial')
+            with open(partial, 'wb') as f:
+                np.save(f, array)
+            os.replace(partial, path)
+            self._evict_disk(keep=path)
+
+    def _remember(self, key: str, array: np.ndarray) -> None:
+        if key in self._memory:
+            self._memory_used -= self._memory.pop(key).nbytes
+        if array.nbytes > self.memory_bytes:
+            return
+        self._memory[key] = array
+        self._memory_used += array.nbytes
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.nbytes
+            self.counters['memory_evictions'] += 1
+
+    def _evict_disk(self, keep: Path) -> None:
+        entries = []
+        for path in self.directory.glob('*.npy'):
+            stat = path.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if used <= self.disk_bytes:
+                break
+            # The entry just written may share its mtime with older ones; it always stays
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            used -= size
+            self.counters['disk_evictions'] += 1
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (counters are kept)"""
+        self._memory.clear()
+        self._memory_used = 0
+        if self.directory is not None:
+            for path in self.directory.glob('*.npy'):
+                path.unlink(missing_ok=True)
+
+
+def cached_compress_image(image_path: Union[str, Path], *args, cache: Optional[ResultCache] = None,
+                          **kwargs) -> 'Image.Image':
+    """compress_image(image_path, *args, **kwargs), served from cache when carved before.
+
+    The key hashes the file's bytes, so a hit neither decodes nor carves
+    the image. Without a cache this is plain compress_image.
+    """
+    from PIL import Image
+    if cache is None:
+        return compress_image(image_path, *args, **kwargs)
+    if not Path(image_path).exists():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+
+    key = cache_key(compress_image, image_path, *args, **kwargs)
+    array = cache.get(key)
+    if array is None:
+        state = np.random.get_state()
+        np.random.seed(TIE_SEED)
+        try:
+            array = np.asarray(compress_image(image_path, *args, **kwargs))
+        finally:
+            np.random.set_state(state)
+        cache.put(key, array)
+    return Image.fromarray(np.array(array))
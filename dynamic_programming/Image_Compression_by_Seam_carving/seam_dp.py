@@ -0,0 +1,409 @@
+import numpy as np
+from math import isqrt
+from typing import Optional
+
+from workspace import work_array
+
+
+def cumulative_energy(energy_map: np.ndarray, dtype=np.float64,
+                      transition_costs: Optional[np.ndarray] = None):
+    """Fill the vertical seam DP table one whole row at a time.
+
+    dp[i, j] is the cheapest top-to-bottom path ending at (i, j) and
+    backtrack[i, j] is the column offset (-1, 0 or 1) of its predecessor in
+    row i - 1. Ties go left, then straight, then right, which is what
+    np.argmin over the neighbour slice did in the per-pixel version. dp is
+    kept in dtype; float32 halves it at the cost of rounding in long seams.
+
+    transition_costs, a (3, height, width) stack, adds the cost of reaching
+    (i, j) from the cell above-left, above and above-right (forward energy);
+    inf forbids a step.
+    """
+    height, width = energy_map.shape
+    dp = np.empty((height, width), dtype=dtype)
+    backtrack = np.zeros((height, width), dtype=np.int8)
+    dp[0] = energy_map[0]
+
+    # Row above padded with inf so the edge columns only see real neighbours
+    padded = np.full(width + 2, np.inf, dtype=dtype)
+    above = padded[:-2], padded[1:-1], padded[2:]
+    left, straight, right = above
+    if transition_costs is not None:
+        # Each candidate is the cell above plus the cost of the step from it
+        candidates = np.empty((3, width), dtype=dtype)
+        left, straight, right = candidates
+    best = np.empty(width, dtype=dtype)
+    take_left = np.empty(width, dtype=bool)
+    take_right = np.empty(width, dtype=bool)
+
+    for i in range(1, height):
+        padded[1:-1] = dp[i - 1]
+        if transition_costs is not None:
+            for candidate, source, cost in zip(candidates, above, transition_costs[:, i]):
+                np.add(source, cost, out=candidate)
+        np.minimum(left, straight, out=best)
+        np.minimum(best, right, out=best)
+        np.equal(left, best, out=take_left)
+        np.less(right, straight, out=take_right)
+        take_right &= ~take_left
+        np.subtract(take_right, take_left, out=backtrack[i], dtype=np.int8)
+        np.add(energy_map[i], best, out=dp[i])
+
+    return dp, backtrack
+
+
+def backtrack_seam(dp: np.ndarray, backtrack: np.ndarray) -> np.ndarray:
+    """Walk the backpointers up from the cheapest cell in the bottom row"""
+    height = dp.shape[0]
+    seam = np.empty(height, dtype=np.int32)
+    col = int(np.argmin(dp[-1]))
+    seam[-1] = col
+    for i in range(height - 1, 0, -1):
+        col += int(backtrack[i, col])
+        seam[i - 1] = col
+    return seam
+
+
+def find_vertical_seam(energy_map: np.ndarray, transition_costs: Optional[np.ndarray] = None) -> np.ndarray:
+    """Column index of the minimum-energy vertical seam in every row (see cumulative_energy for transition_costs)"""
+    return backtrack_seam(*cumulative_energy(energy_map, transition_costs=transition_costs))
+
+
+def find_horizontal_seam(energy_map: np.ndarray) -> np.ndarray:
+    """Row index of the minimum-energy horizontal seam in every column"""
+    return find_vertical_seam(energy_map.T)
+
+
+def find_vertical_seams(energy_map: np.ndarray, count: int,
+                        transition_costs: Optional[np.ndarray] = None) -> np.ndarray:
+    """Up to count vertical seams that share no pixel, all from one DP table.
+
+    Seams are backtracked from the cheapest bottom cells first. When a
+    backpointer leads onto a pixel an earlier seam already took, the walk
+    moves to the cheapest free cell of the three above instead, and a walk
+    that finds all three taken is dropped. The first seam is the one
+    find_vertical_seam returns. Returns a (seams, height) array.
+    """
+    dp, backtrack = cumulative_energy(energy_map, transition_costs=transition_costs)
+    return backtrack_seams(dp, backtrack, count, transition_costs)
+
+
+def backtrack_seams(dp: np.ndarray, backtrack: np.ndarray, count: int,
+                    transition_costs: Optional[np.ndarray] = None) -> np.ndarray:
+    """The backtracking half of find_vertical_seams, on a table from cumulative_energy"""
+    height, width = dp.shape
+    taken = np.zeros((height, width), dtype=bool)
+    rows = np.arange(height)
+    seams = []
+    for start in np.argsort(dp[-1], kind='stable'):
+        if len(seams) == count:
+            break
+        seam = np.empty(height, dtype=np.int32)
+        col = int(start)
+        seam[-1] = col
+        for i in range(height - 1, 0, -1):
+            above = col + int(backtrack[i, col])
+            if taken[i - 1, above]:
+                free = [c for c in (col - 1, col, col + 1) if 0 <= c < width and not taken[i - 1, c]]
+                if not free:
+                    break
+                if transition_costs is None:
+                    above = min(free, key=lambda c: dp[i - 1, c])
+                else:
+                    above = min(free, key=lambda c: dp[i - 1, c] + transition_costs[c - col + 1, i, col])
+            col = above
+            seam[i - 1] = col
+        else:
+            taken[rows, seam] = True
+            seams.append(seam)
+    return np.array(seams, dtype=np.int32).reshape(len(seams), height)
+
+
+def find_horizontal_seams(energy_map: np.ndarray, count: int) -> np.ndarray:
+    """Up to count horizontal seams that share no pixel, as a (seams, width) array of rows"""
+    return find_vertical_seams(energy_map.T, count)
+
+
+def seam_cost(energy_map: np.ndarray, seams: np.ndarray, axis: int = 1) -> float:
+    """Summed energy_map of the cells of one seam, or of a (seams, length) batch, vertical (axis=1) or horizontal"""
+    seams = np.asarray(seams)
+    index = np.arange(seams.shape[-1])
+    return float(energy_map[index, seams].sum() if axis == 1 else energy_map[seams, index].sum())
+
+
+def upsample_seam(seam: np.ndarray, height: int, width: int, scale: int) -> np.ndarray:
+    """Guide path through a map scale times the size of seam's: one column per row, steps of at most one"""
+    centre = scale // 2
+    columns = np.interp(np.arange(height), scale * np.arange(len(seam)) + centre, scale * seam + centre)
+    # floor (not rint) keeps every step at most one column
+    return np.clip(np.floor(columns).astype(np.intp), 0, width - 1)
+
+
+# Where the cell above can sit relative to a cell, besides straight above,
+# once the band has moved by -1, 0 or 1 columns
+BAND_OFFSETS = (-2, -1, 1, 2)
+
+
+def _band_step(above: np.ndarray, costs: np.ndarray, penalties: np.ndarray, out: np.ndarray) -> None:
+    """One row of the banded recurrence for a whole stack of band rows.
+
+    above and out hold band rows along the first axis with two inf cells on
+    either end; cell k of out comes from cells k + shift - 1 to
+    k + shift + 1 of above, shift being how far the band moved. penalties
+    holds, per BAND_OFFSETS entry, 0 where that offset is one of those
+    three cells and inf elsewhere. The band runs along the first axis so
+    that every ufunc loops over the long stack rather than the few cells.
+    """
+    span = above.shape[0] - 4
+    cells = out[2:span + 2]
+    np.copyto(cells, above[2:span + 2])
+    candidate = np.empty_like(cells)
+    for offset, penalty in zip(BAND_OFFSETS, penalties):
+        np.add(above[2 + offset:2 + offset + span], penalty, out=candidate)
+        np.minimum(cells, candidate, out=cells)
+    cells += costs
+
+
+def refine_vertical_seam(energy_map: np.ndarray, guide: np.ndarray, band: int,
+                         taken: np.ndarray = None):
+    """Cheapest vertical seam that stays within band columns of guide in every row.
+
+    guide must move at most one column per row, as upsample_seam's paths do.
+    Only the (height, 2 * band + 1) cells of the band are read, and cells
+    marked in taken are never used. Returns None if every path is blocked.
+
+    A band row is too narrow for one NumPy call per row to pay off, so the
+    rows are cut into blocks of about sqrt(height). Every block's min-plus
+    transfer matrix is built for all blocks at once, the block entry rows
+    follow from one small product per block, and the rows inside the blocks
+    are filled in, again for all blocks at once.
+    """
+    height, width = energy_map.shape
+    span = min(2 * band + 1, width)
+    start = np.clip(guide - band, 0, width - span)
+    rows, cols = np.arange(height)[:, None], start[:, None] + np.arange(span)
+    costs = energy_map[rows, cols].astype(float)
+    if taken is not None:
+        costs[taken[rows, cols]] = np.inf
+    shifts = np.diff(start)
+
+    block = max(isqrt(height), 1)
+    blocks = max(-(-(height - 1) // block), 1)
+    # Rows after the last one are padded in and dropped again at the end;
+    # laid out as [row in block, band cell, block]
+    block_costs = np.zeros((blocks * block, span))
+    block_costs[:height - 1] = costs[1:]
+    block_costs = block_costs.reshape(blocks, block, span).transpose(1, 2, 0).copy()
+    block_shifts = np.zeros(blocks * block, dtype=np.intp)
+    block_shifts[:height - 1] = shifts
+    block_shifts = block_shifts.reshape(blocks, block).T
+    # [offset, row in block, block]
+    penalties = np.where(np.abs(block_shifts - np.array(BAND_OFFSETS)[:, None, None]) <= 1, 0.0, np.inf)
+
+    # transfer[2 + k, j, b]: cheapest way from cell j of block b's entry row to cell k of its last row
+    transfer, scratch = np.full((2, span + 4, span, blocks), np.inf)
+    transfer[2 + np.arange(span), np.arange(span)] = 0
+    for t in range(block):
+        _band_step(transfer, block_costs[t, :, None], penalties[:, t, None], scratch)
+        transfer, scratch = scratch, transfer
+    transfer = transfer[2:span + 2].transpose(2, 0, 1).copy()
+    entries = np.empty((blocks, span))
+    entries[0] = costs[0]
+    for b in range(1, blocks):
+        entries[b] = np.min(transfer[b - 1] + entries[b - 1], axis=1)
+
+    dp = np.full((block + 1, span + 4, blocks), np.inf)
+    dp[0, 2:span + 2] = entries.T
+    for t in range(block):
+        _band_step(dp[t], block_costs[t], penalties[:, t], dp[t + 1])
+    dp = np.concatenate((costs[:1], dp[1:, 2:span + 2].transpose(2, 0, 1).reshape(-1, span)[:height - 1]))
+
+    # Predecessor of every cell, same tie-break as cumulative_energy: left, then straight, then right
+    padded = np.full((height - 1, span + 4), np.inf)
+    padded[:, 2:span + 2] = dp[:-1]
+    straight = np.arange(span) + shifts[:, None] + 2
+    left, middle, right = (padded[rows[:-1], straight + d] for d in (-1, 0, 1))
+    step = np.where((left <= middle) & (left <= right), -1, np.where(right < middle, 1, 0))
+    previous = (straight - 2 + step).tolist()
+
+    k = int(np.argmin(dp[-1]))
+    if np.isinf(dp[-1, k]):
+        return None
+    path = [k]
+    for i in range(height - 2, -1, -1):
+        k = previous[i][k]
+        path.append(k)
+    return (start + path[::-1]).astype(np.int32)
+
+
+def find_vertical_seams_pyramid(energy_map: np.ndarray, count: int = 1,
+                                depth: int = 3, band: int = 4) -> np.ndarray:
+    """Up to count disjoint vertical seams, found on a coarse map and refined at full size.
+
+    The coarse map keeps every (2 ** depth)-th pixel in both directions, a
+    strided view, so building it costs nothing. Its seams come from
+    find_vertical_seams; each is upsampled and refined with
+    refine_vertical_seam within band columns of that path. The seams are
+    approximate: a cheaper seam that leaves the band is missed. depth=0
+    gives the exact find_vertical_seams. Returns a (seams, height) array.
+    """
+    scale = 2 ** depth
+    coarse = energy_map[scale // 2::scale, scale // 2::scale]
+    if depth == 0 or min(coarse.shape) < 2:
+        return find_vertical_seams(energy_map, count)
+
+    height, width = energy_map.shape
+    taken = np.zeros((height, width), dtype=bool) if count > 1 else None
+    seams = []
+    for seam in find_vertical_seams(coarse, count):
+        seam = refine_vertical_seam(energy_map, upsample_seam(seam, height, width, scale), band, taken)
+        if seam is None:
+            continue
+        if taken is not None:
+            taken[np.arange(height), seam] = True
+        seams.append(seam)
+    return np.array(seams, dtype=np.int32).reshape(len(seams), height)
+
+
+def find_horizontal_seams_pyramid(energy_map: np.ndarray, count: int = 1,
+                                  depth: int = 3, band: int = 4) -> np.ndarray:
+    """Coarse-to-fine find_horizontal_seams, as a (seams, width) array of rows"""
+    return find_vertical_seams_pyramid(energy_map.T, count, depth, band)
+
+
+class SeamFinder:
+    """Seam search that keeps its DP table between seam removals.
+
+    axis=1 finds vertical seams, axis=0 horizontal ones (the table is then
+    kept over the transposed map). The energy map must only change next to
+    removed seams, i.e. come from a 3x3-local energy kept by EnergyCache
+    without a global combine step.
+
+    Removals are only recorded by seam_removed(); find() brings the table up
+    to date. Rows above the first row a removal across the table disturbed
+    are kept as they are. In those rows a single removal along the table
+    shifts each row over its seam cell and re-fills only the cone below the
+    cells next to the seam, closing it on rows where the new values match
+    the old ones. Everything else, including a cone grown wider than half a
+    row, is recomputed a whole row at a time. The
+    table always equals a fresh cumulative_energy, so find() returns the same
+    seam as find_vertical_seam/find_horizontal_seam.
+
+    dtype and directory choose the table's type (float32 halves it) and
+    whether it lives in a temporary file there, see work_array.
+    """
+
+    def __init__(self, axis: int = 1, dtype=np.float64, directory: Optional[str] = None):
+        if axis not in (0, 1):
+            raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+        self.axis = axis
+        self.dtype = dtype
+        self.directory = directory
+        self._dp = None
+        self._shape = None
+        self._along = []
+        self._stale_from = 0
+
+    def seam_removed(self, seam: np.ndarray, axis: int = 1) -> None:
+        """Record that seam was removed from the image along axis"""
+        if self._dp is None:
+            return
+        if axis == self.axis:
+            self._along.append(seam)
+        else:
+            # Rows above the seam's energy band keep their pixels, values and predecessors
+            self._stale_from = min(self._stale_from, max(int(np.min(seam)) - 1, 0))
+
+    def find(self, energy_map: np.ndarray) -> np.ndarray:
+        """Minimum-energy seam of energy_map, the current map of the carved image"""
+        self.update(energy_map)
+        return self.backtrack()
+
+    def update(self, energy_map: np.ndarray) -> None:
+        """The DP half of find(): bring the table up to date with energy_map"""
+        energy = energy_map if self.axis == 1 else energy_map.T
+        height, width = energy.shape
+        if self._dp is None or len(self._along) > 1:
+            # One inf column on each side so the three cells above are always plain slices
+            self._dp = work_array((height, width + 2), self.dtype, self.directory)
+            self._dp.fill(np.inf)
+            self._stale_from = 0
+        elif self._along:
+            self._stale_from = self._shift_along(self._along[0], energy)
+
+        self._fill_rows(energy, self._stale_from)
+        self._along = []
+        self._stale_from = height
+        self._shape = height, width
+
+    def _shift_along(self, seam: np.ndarray, energy: np.ndarray) -> int:
+        """Take one cell out of every kept row and re-fill the cone it disturbed.
+
+        Returns the first row left for _fill_rows: the cone is given up once it
+        covers half a row, where the whole-row kernel is cheaper.
+        """
+        dp, rows, width = self._dp, self._stale_from, energy.shape[1]
+        for i in range(rows):
+            col = seam[i]
+            dp[i, col + 1:width + 1] = dp[i, col + 2:width + 2]
+        dp[:rows, width + 1] = np.inf
+
+        # Energy and predecessors changed in new columns min(seam[i-1:i+2]) - 1 to max(seam[i-1:i+2]),
+        # so the last kept row also looks at the seam cell of the row below it
+        padded = np.concatenate(([seam[0]], seam[:rows], [seam[min(rows, len(seam) - 1)] if rows else 0]))
+        first = np.minimum(np.minimum(padded[:-2], padded[1:-1]), padded[2:]) - 1
+        last = np.maximum(np.maximum(padded[:-2], padded[1:-1]), padded[2:]) + 1
+
+        cone = None
+        for i in range(rows):
+            lo, hi = first[i], last[i]
+            if cone is not None:
+                lo, hi = min(lo, cone[0] - 1), max(hi, cone[1] + 1)
+            lo, hi = max(lo, 0), min(hi, width)
+            if 2 * (hi - lo) > width:
+                return i
+            if i == 0:
+                values = energy[0, lo:hi]
+            else:
+                above = dp[i - 1]
+                values = np.minimum(above[lo:hi], above[lo + 1:hi + 1])
+                np.minimum(values, above[lo + 2:hi + 2], out=values)
+                values += energy[i, lo:hi]
+            cells = dp[i, lo + 1:hi + 1]
+            changed = np.flatnonzero(values != cells)
+            cells[...] = values
+            cone = (lo + changed[0], lo + changed[-1] + 1) if changed.size else None
+        return rows
+
+    def _fill_rows(self, energy: np.ndarray, start: int) -> None:
+        """Recompute whole rows from start down, same recurrence as cumulative_energy"""
+        dp = self._dp
+        height, width = energy.shape
+        dp[start:height, width + 1] = np.inf
+        if start == 0 and height:
+            dp[0, 1:width + 1] = energy[0]
+            start = 1
+        for i in range(start, height):
+            above, cells = dp[i - 1], dp[i, 1:width + 1]
+            np.minimum(above[:width], above[1:width + 1], out=cells)
+            np.minimum(cells, above[2:width + 2], out=cells)
+            cells += energy[i]
+
+    def backtrack(self) -> np.ndarray:
+        """The backtracking half of find(): walk up from the bottom row of the last update()'s table.
+
+        Predecessors are read straight off the table rather than stored.
+        """
+        dp, (height, width) = self._dp, self._shape
+        seam = np.empty(height, dtype=np.int32)
+        col = int(np.argmin(dp[height - 1, 1:width + 1]))
+        seam[-1] = col
+        for i in range(height - 1, 0, -1):
+            # Same tie-break as cumulative_energy: left, then straight, then right
+            left, straight, right = dp[i - 1, col], dp[i - 1, col + 1], dp[i - 1, col + 2]
+            if left <= straight and left <= right:
+                col -= 1
+            elif right < straight:
+                col += 1
+            seam[i - 1] = col
+        return seam
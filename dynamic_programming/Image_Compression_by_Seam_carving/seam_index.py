@@ -0,0 +1,92 @@
+"""Carve an image once, then cut it to any width without energy or DP work.
+
+    order = build_seam_index(img_array)                 # slow, once per image
+    save_seam_index(index_path("photo.png"), order)
+    narrow = retarget(img_array, load_seam_index(index_path("photo.png")), 640)
+
+The index holds, for every pixel, the step at which carving removed it.
+Removing the first k seams is then the same as keeping the pixels whose
+step is k or later, which is one masked gather.
+"""
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from carving_buffer import CarvingBuffer
+from energy_cache import EnergyCache
+from image_compression_by_seam_carving import calculate_energy
+from seam_dp import SeamFinder
+
+
+def index_dtype(steps: int):
+    """Smallest unsigned dtype that holds every step number up to steps"""
+    return np.uint16 if steps <= np.iinfo(np.uint16).max else np.uint32
+
+
+def build_seam_index(img_array: np.ndarray, min_size: int = 1, axis: int = 1,
+                     on_step: Optional[Callable[[int, int], None]] = None) -> np.ndarray:
+    """Removal step of every pixel when carving along axis down to min_size.
+
+    Seams are removed one at a time exactly as carve() removes them, so
+    retarget(img_array, order, size) equals carving to size directly.
+    Pixels that are never removed get the total number of steps.
+    """
+    if axis not in (0, 1):
+        raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+    if axis == 0:
+        # The Sobel energy does not depend on orientation, so rows are the columns of the transpose
+        order = build_seam_index(img_array.swapaxes(0, 1), min_size, axis=1, on_step=on_step)
+        return order.T.copy()
+
+    height, width = img_array.shape[:2]
+    if not 1 <= min_size <= width:
+        raise ValueError(f"Minimum size must be between 1 and {width}, got {min_size}")
+    steps = width - min_size
+    order = np.full((height, width), steps, dtype=index_dtype(steps))
+
+    cache = EnergyCache(img_array, calculate_energy)
+    finder = SeamFinder(axis=1)
+    # Original column of every live pixel, carved alongside the image
+    columns = CarvingBuffer(np.broadcast_to(np.arange(width, dtype=np.int32), (height, width)))
+    rows = np.arange(height)
+    for step in range(steps):
+        seam = finder.find(cache.energy)
+        order[rows, columns.image[rows, seam]] = step
+        cache.remove_seam(seam, axis=1)
+        columns.remove_seam(seam, axis=1)
+        finder.seam_removed(seam, axis=1)
+        if on_step is not None:
+            on_step(step + 1, steps)
+    return order
+
+
+def retarget(img_array: np.ndarray, order: np.ndarray, size: int, axis: int = 1) -> np.ndarray:
+    """img_array carved to size columns (axis=1) or rows (axis=0) using a seam index"""
+    if axis not in (0, 1):
+        raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+    if order.shape != img_array.shape[:2]:
+        raise ValueError(f"Seam index shape {order.shape} does not match image shape {img_array.shape[:2]}")
+    if axis == 0:
+        return retarget(img_array.swapaxes(0, 1), order.T, size, axis=1).swapaxes(0, 1).copy()
+
+    height, width = order.shape
+    steps = int(order.max(initial=0))
+    if not width - steps <= size <= width:
+        raise ValueError(f"Index reaches sizes {width - steps} to {width}, got {size}")
+    keep = order >= width - size
+    return img_array[keep].reshape((height, size) + img_array.shape[2:])
+
+
+def index_path(image_path: Union[str, Path]) -> Path:
+    """Where the seam index of an image is kept: next to it, as photo.png.seams.npy"""
+    image_path = Path(image_path)
+    return image_path.with_name(image_path.name + '.seams.npy')
+
+
+def save_seam_index(path: Union[str, Path], order: np.ndarray) -> None:
+    np.save(path, order)
+
+
+def load_seam_index(path: Union[str, Path]) -> np.ndarray:
+    return np.load(path)
@@ -1,53 +1,38 @@
 import numpy as np
-from scipy.ndimage import sobel
-from PIL import Image
+from seam_dp import cumulative_energy, backtrack_seam, seam_cost
+from energy_cache import EnergyCache, delete_seam
+from parallel_energy import strip_energy
+from energy_kernels import luminance_energy, gradient_l1
+from carving_events import SeamEvent, ignore
+from time import perf_counter
 
-def calculate_energy(img_array):
-    """Calculate energy map with improved gradient calculation and normalization"""
-    energy_map = np.zeros((img_array.shape[0], img_array.shape[1]))
-    weights = [0.299, 0.587, 0.114]
-    
-    for channel, weight in enumerate(weights):
-        sobel_x = sobel(img_array[:, :, channel], axis=0)
-        sobel_y = sobel(img_array[:, :, channel], axis=1)
-        energy_map += weight * np.hypot(sobel_x, sobel_y)
+def energy_terms(img_array, threads=None):
+    """Per-pixel parts of the energy; large images are split into strips on a thread pool"""
+    return strip_energy(local_energy_terms, img_array, threads)
+
+def local_energy_terms(img_array):
+    """Per-pixel parts of the energy, stacked as (weighted Sobel, R, G, B gradient penalties)"""
+    terms = np.empty((img_array.shape[0], img_array.shape[1], 4))
+    # Each kernel handles all three channels in one pass, see energy_kernels
+    luminance_energy(img_array, out=terms[:, :, 0])
+    gradient_l1(img_array, out=terms[:, :, 1:])
+    terms[:, :, 1:] *= 0.05
     
+    return terms
+
+def combine_energy_terms(terms):
+    """Normalize the Sobel term over the whole image and add the gradient penalties"""
+    energy_map = terms[:, :, 0]
     energy_map = (energy_map - np.min(energy_map)) / (np.max(energy_map) - np.min(energy_map))
     
     for channel in range(3):
-        grad_x = np.gradient(img_array[:, :, channel], axis=1)
-        grad_y = np.gradient(img_array[:, :, channel], axis=0)
-        energy_map += 0.05 * (np.abs(grad_x) + np.abs(grad_y))
+        energy_map += terms[:, :, channel + 1]
     
     return energy_map
 
-def find_vertical_seam(energy_map):
-    """Find vertical seam with bounds-checked backtracking"""
-    height, width = energy_map.shape
-    dp = np.copy(energy_map)
-    backtrack = np.zeros((height, width), dtype=np.int32)
-    
-    # Fill dp table
-    for i in range(1, height):
-        for j in range(width):
-            # Get the possible previous positions
-            prev_cols = slice(max(0, j-1), min(width, j+2))
-            min_idx = np.argmin(dp[i-1, prev_cols])
-            min_energy = dp[i-1, prev_cols][min_idx]
-            
-            # Store the relative offset (-1, 0, or 1) in backtrack
-            backtrack[i, j] = min_idx - (1 if j > 0 else 0)
-            dp[i, j] += min_energy
-    
-    # Backtrack to find optimal seam
-    seam = np.zeros(height, dtype=np.int32)
-    seam[-1] = np.argmin(dp[-1])
-    
-    for i in range(height-2, -1, -1):
-        offset = backtrack[i+1, seam[i+1]]
-        seam[i] = min(max(seam[i+1] + offset, 0), width-1)
-    
-    return seam
+def calculate_energy(img_array, threads=None):
+    """Calculate energy map with improved gradient calculation and normalization"""
+    return combine_energy_terms(energy_terms(img_array, threads))
 
 def remove_seam(img_array, seam, axis=1):
     """Remove seam with proper array handling"""
@@ -60,11 +45,15 @@ def remove_seam(img_array, seam, axis=1):
             new_array[i, seam[i]:] = img_array[i, seam[i]+1:]
             
         return new_array
-    else:  # horizontal seam
-        return remove_seam(img_array.transpose(1, 0, 2), seam, 1).transpose(1, 0, 2)
+    else:  # horizontal seam, removed row by row so the result stays C-ordered
+        return delete_seam(img_array, seam, axis=0)
 
-def compress_image(image_path, num_seams, direction='both'):
-    """Main compression function with improved seam removal strategy"""
+def compress_image(image_path, num_seams, direction='both', observer=ignore):
+    """Main compression function with improved seam removal strategy
+    
+    observer gets a SeamEvent after every seam (see carving_events).
+    """
+    from PIL import Image
     img = np.array(Image.open(image_path))
     
     if direction == 'both':
@@ -74,32 +63,50 @@ def compress_image(image_path, num_seams, direction='both'):
     else:
         v_seams, h_seams = 0, num_seams
     
+    return Image.fromarray(carve(img, v_seams, h_seams, observer))
+
+def carve(img, v_seams, h_seams, observer=ignore):
+    """Remove v_seams vertical seams, then h_seams horizontal ones, and return the carved array"""
+    # Only the terms next to each removed seam are recomputed, the normalization is redone in full
+    cache = EnergyCache(img, energy_terms, combine_energy_terms)
+    
     # Remove vertical seams
     for i in range(v_seams):
-        if img.shape[1] <= 2:  # Check if image is too narrow
-            print(f"Stopping vertical compression: image width ({img.shape[1]}) too small")
+        if cache.image.shape[1] <= 2:  # Check if image is too narrow
+            print(f"Stopping vertical compression: image width ({cache.image.shape[1]}) too small")
             break
             
-        energy_map = calculate_energy(img)
-        seam = find_vertical_seam(energy_map)
-        img = remove_seam(img, seam, axis=1)
-        if (i + 1) % 10 == 0:
-            print(f"Removed {i + 1}/{v_seams} vertical seams")
+        observer(remove_timed_seam(cache, i, axis=1))
             
     # Remove horizontal seams
     for i in range(h_seams):
-        if img.shape[0] <= 2:  # Check if image is too tall
-            print(f"Stopping horizontal compression: image height ({img.shape[0]}) too small")
+        if cache.image.shape[0] <= 2:  # Check if image is too tall
+            print(f"Stopping horizontal compression: image height ({cache.image.shape[0]}) too small")
             break
             
-        energy_map = calculate_energy(img)
-        seam = find_vertical_seam(energy_map.T)
-        img = remove_seam(img, seam, axis=0)
-        if (i + 1) % 10 == 0:
-            print(f"Removed {i + 1}/{h_seams} horizontal seams")
+        observer(remove_timed_seam(cache, i, axis=0))
     
-    return Image.fromarray(img)
+    return cache.image
+
+def remove_timed_seam(cache, index, axis):
+    """Find and remove one seam along axis, returning the SeamEvent with its phase timings"""
+    start = perf_counter()
+    energy_map = cache.energy
+    combined = perf_counter()
+    table = cumulative_energy(energy_map if axis == 1 else energy_map.T)
+    filled = perf_counter()
+    seam = backtrack_seam(*table)
+    cost = seam_cost(energy_map, seam, axis)
+    found = perf_counter()
+    cache.cut(seam, axis)
+    cut = perf_counter()
+    cache.refresh(seam, axis)
+    refreshed = perf_counter()
+    return SeamEvent(index, 'vertical' if axis == 1 else 'horizontal', cache.image.shape[:2],
+                     energy=(combined - start) + (refreshed - cut), dp=found - combined, removal=cut - found,
+                     backtrack=found - filled, cost=cost)
 
 # Example usage
-image = compress_image("dory.png", 120, direction='both')
-image.save("compressed_output.jpg")
\ No newline at end of file
+if __name__ == "__main__":
+    image = compress_image("dory.png", 120, direction='both')
+    image.save("compressed_output.jpg")
\ No newline at end of file
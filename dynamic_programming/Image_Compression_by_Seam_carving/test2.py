@@ -1,48 +1,28 @@
 import numpy as np
-from scipy.ndimage import sobel
-from PIL import Image
-from typing import Tuple, Union, Literal
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, Union, Literal
 from pathlib import Path
+import time
+import seam_dp
+from energy_cache import delete_seams
+from carving_buffer import CarvingBuffer
+from parallel_energy import strip_energy
+from energy_kernels import luminance_energy, gradient_l1
+from carving_events import SeamEvent, ignore
 
-def calculate_energy(img_array: np.ndarray, eps: float = 1e-8) -> np.ndarray:
-    """Calculate energy map with improved gradient calculation and color coherence"""
+if TYPE_CHECKING:
+    from PIL import Image
+
+def calculate_energy(img_array: np.ndarray, eps: float = 1e-8, threads: Optional[int] = None) -> np.ndarray:
+    """Calculate energy map with improved gradient calculation and color coherence.
+    
+    The per-pixel part runs in horizontal strips on a thread pool for large
+    images (threads=None picks automatically); only the normalisation needs
+    the whole map.
+    """
     if img_array.ndim != 3:
         raise ValueError("Input image must have 3 dimensions (height, width, channels)")
-        
-    height, width = img_array.shape[:2]
-    energy_map = np.zeros((height, width))
-    
-    # RGB to grayscale weights (human perception)
-    weights = np.array([0.299, 0.587, 0.114])
-    
-    for y in range(1, height):
-        for x in range(width):
-            if x == 0:
-                left_cost = float('inf')
-            else:
-                left_cost = np.sum(np.abs(img_array[y, x] - img_array[y, x-1])) + \
-                           np.sum(np.abs(img_array[y-1, x] - img_array[y, x-1]))
-                
-            if x == width-1:
-                right_cost = float('inf')
-            else:
-                right_cost = np.sum(np.abs(img_array[y, x] - img_array[y, x+1])) + \
-                            np.sum(np.abs(img_array[y-1, x] - img_array[y, x+1]))
-                
-            straight_cost = np.sum(np.abs(img_array[y-1, x] - img_array[y, x]))
-            
-            energy_map[y, x] = min(left_cost, straight_cost, right_cost)
     
-    for channel, weight in enumerate(weights):
-        sobel_x = sobel(img_array[:, :, channel], axis=0)
-        sobel_y = sobel(img_array[:, :, channel], axis=1)
-        energy_map += weight * np.hypot(sobel_x, sobel_y)
-    
-    for channel in range(3):
-        grad_x = np.gradient(img_array[:, :, channel], axis=1)
-        grad_y = np.gradient(img_array[:, :, channel], axis=0)
-        color_coherence = 0.02 * (np.abs(grad_x) + np.abs(grad_y))
-        energy_map += color_coherence
+    energy_map = strip_energy(local_energy, img_array, threads)
     
     energy_range = np.max(energy_map) - np.min(energy_map)
     if energy_range > eps:
@@ -52,41 +32,85 @@ def calculate_energy(img_array: np.ndarray, eps: float = 1e-8) -> np.ndarray:
     
     return energy_map
 
-def find_vertical_seam(energy_map: np.ndarray) -> np.ndarray:
-    """Find vertical seam with improved handling of flat regions and edges"""
-    height, width = energy_map.shape
-    dp = np.copy(energy_map)
-    backtrack = np.zeros((height, width), dtype=np.int32)
-    
-    dp += np.random.random(dp.shape) * 1e-5
-    
-    for i in range(1, height):
-        for j in range(width):
-            if j == 0:
-                neighbors = dp[i-1, j:j+2]
-                min_idx = np.argmin(neighbors)
-                backtrack[i, j] = min_idx
-                dp[i, j] += neighbors[min_idx]
-            elif j == width-1:
-                neighbors = dp[i-1, j-1:j+1]
-                min_idx = np.argmin(neighbors)
-                backtrack[i, j] = min_idx - 1
-                dp[i, j] += neighbors[min_idx]
-            else:
-                neighbors = dp[i-1, j-1:j+2]
-                min_idx = np.argmin(neighbors)
-                backtrack[i, j] = min_idx - 1
-                dp[i, j] += neighbors[min_idx]
+def calculate_forward_energy(img_array: np.ndarray, eps: float = 1e-8,
+                             threads: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Gradient energy map and forward transition costs, for the DP to add step by step.
     
-    seam = np.zeros(height, dtype=np.int32)
-    seam[-1] = np.argmin(dp[-1])
+    Both are scaled like calculate_energy's map, which folds the cheapest
+    step of every pixel into it instead, so the two modes' energies compare.
+    """
+    if img_array.ndim != 3:
+        raise ValueError("Input image must have 3 dimensions (height, width, channels)")
+    
+    energy_map = strip_energy(gradient_energy, img_array, threads)
+    costs = forward_costs(img_array)
+    folded = energy_map + costs.min(axis=0)
     
-    for i in range(height - 2, -1, -1):
-        offset = backtrack[i + 1, seam[i + 1]]
-        seam[i] = np.clip(seam[i + 1] + offset, 0, width - 1)
+    energy_range = np.max(folded) - np.min(folded)
+    if energy_range > eps:
+        return (energy_map - np.min(folded)) / energy_range, costs / energy_range
+    return np.zeros_like(energy_map), costs
 
+def forward_costs(img_array: np.ndarray) -> np.ndarray:
+    """(3, height, width) cost of reaching every pixel from above-left, above and above-right.
+    
+    A step costs the color differences it brings together; steps off the
+    image are inf and the top row costs nothing. Differences are taken in
+    the image's own dtype, as the per-pixel loop this replaces did.
+    """
+    height, width = img_array.shape[:2]
+    costs = np.zeros((3, height, width))
+    above, row = img_array[:-1], img_array[1:]
     
-    return seam
+    def difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.abs(a - b).sum(axis=-1)
+    
+    costs[0, 1:, 0] = np.inf
+    costs[0, 1:, 1:] = difference(row[:, 1:], row[:, :-1]) + difference(above[:, 1:], row[:, :-1])
+    costs[1, 1:] = difference(above, row)
+    costs[2, 1:, -1] = np.inf
+    costs[2, 1:, :-1] = difference(row[:, :-1], row[:, 1:]) + difference(above[:, :-1], row[:, 1:])
+    return costs
+
+def local_energy(img_array: np.ndarray) -> np.ndarray:
+    """Cheapest forward cost, Sobel magnitude and color coherence of every pixel, before normalisation"""
+    energy_map = forward_costs(img_array).min(axis=0)
+    return gradient_energy(img_array, energy_map)
+
+def gradient_energy(img_array: np.ndarray, energy_map: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sobel magnitude and color coherence of every pixel, added onto energy_map in place when given"""
+    if energy_map is None:
+        energy_map = np.zeros(img_array.shape[:2])
+    
+    # Sobel magnitudes weighted by luminance (human perception), all channels in one pass
+    energy_map += luminance_energy(img_array)
+    
+    color_coherence = gradient_l1(img_array).sum(axis=2)
+    color_coherence *= 0.02
+    energy_map += color_coherence
+    
+    return energy_map
+
+def find_vertical_seam(energy_map: np.ndarray, transition_costs: Optional[np.ndarray] = None) -> np.ndarray:
+    """Find vertical seam with improved handling of flat regions and edges"""
+    # Tiny noise breaks ties in flat regions; the DP itself is seam_dp's row-vectorized one
+    return seam_dp.find_vertical_seam(energy_map + np.random.random(energy_map.shape) * 1e-5, transition_costs)
+
+def find_vertical_seams(energy_map: np.ndarray, count: int, pyramid_depth: int = 0, band: int = 4,
+                        transition_costs: Optional[np.ndarray] = None) -> np.ndarray:
+    """Find up to count pixel-disjoint vertical seams from a single DP pass.
+    
+    With pyramid_depth > 0 the seams are found on a map 2 ** pyramid_depth
+    times smaller and refined within band columns at full size, which is
+    faster but approximate (see compare_pyramid_depths). transition_costs
+    (see calculate_forward_energy) needs the exact search.
+    """
+    noisy = energy_map + np.random.random(energy_map.shape) * 1e-5
+    if transition_costs is not None:
+        if pyramid_depth:
+            raise ValueError("Transition costs need the exact search (pyramid_depth=0)")
+        return seam_dp.find_vertical_seams(noisy, count, transition_costs)
+    return seam_dp.find_vertical_seams_pyramid(noisy, count, pyramid_depth, band)
 
 def remove_seam(img_array: np.ndarray, seam: np.ndarray, axis: int = 1) -> np.ndarray:
     """Remove seam with color blending at removal points."""
@@ -117,21 +141,51 @@ def remove_seam(img_array: np.ndarray, seam: np.ndarray, axis: int = 1) -> np.nd
         
         return new_array
     
-    else:  # Horizontal seam
-        return remove_seam(img_array.transpose(1, 0, 2), seam, axis=1).transpose(1, 0, 2)
+    else:  # Horizontal seam, blended and removed in row order
+        return remove_seams(img_array, seam[None], axis=0)
 
 
-def compress_image(
-    image_path: Union[str, Path],
-    num_seams: int,
-    direction: Literal['both', 'vertical', 'horizontal'] = 'both',
-    min_dimension: int = 2
-) -> Image.Image:
-    """Compress image without logging"""
-    if not Path(image_path).exists():
-        raise FileNotFoundError(f"Image file not found: {image_path}")
+def blend_seams(img_array: np.ndarray, seams: np.ndarray, axis: int = 1) -> None:
+    """Give the pixel before every removed one the average of its two neighbours, in place."""
+    if axis not in (0, 1):
+        raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
     
-    img = np.array(Image.open(image_path))
+    if axis == 0:
+        blend_seams(img_array.swapaxes(0, 1), seams, axis=1)
+        return
+    
+    height, width = img_array.shape[:2]
+    rows = np.broadcast_to(np.arange(height), seams.shape)
+    inner = (seams > 0) & (seams < width - 1)
+    rows, cols = rows[inner], seams[inner]
+    # Both neighbours are gathered before anything is written back
+    img_array[rows, cols - 1] = ((img_array[rows, cols - 1].astype(float) +
+                                  img_array[rows, cols + 1].astype(float)) / 2).astype(img_array.dtype)
+
+
+def remove_seams(img_array: np.ndarray, seams: np.ndarray, axis: int = 1) -> np.ndarray:
+    """Remove a (seams, length) batch of disjoint seams with one mask, blending like remove_seam."""
+    if axis not in (0, 1):
+        raise ValueError("Axis must be 0 (horizontal) or 1 (vertical)")
+    
+    if axis == 0:
+        # Carve a row-ordered copy rather than a transposed view, so later steps read contiguous rows
+        buffer = CarvingBuffer(img_array)
+        blend_seams(buffer.image, seams, axis=0)
+        buffer.remove_seams(seams, axis=0)
+        return buffer.image
+    
+    blended = img_array.copy()
+    blend_seams(blended, seams)
+    return delete_seams(blended, seams)
+
+
+def split_seams(
+    img: np.ndarray,
+    num_seams: int,
+    direction: Literal['both', 'vertical', 'horizontal'] = 'both'
+) -> Tuple[int, int]:
+    """Number of vertical and horizontal seams to remove for a direction"""
     original_aspect = img.shape[1] / img.shape[0]
     
     if direction == 'both':
@@ -143,30 +197,171 @@ def compress_image(
     else:
         v_seams, h_seams = 0, num_seams
     
-    recalc_interval = 10
+    return v_seams, h_seams
+
+
+def carve_seams(
+    img: np.ndarray,
+    num_seams: int,
+    axis: int = 1,
+    batch_size: int = 10,
+    min_dimension: int = 2,
+    pyramid_depth: int = 0,
+    band: int = 4,
+    forward: Literal['map', 'dp'] = 'map',
+    observer: Callable[[SeamEvent], None] = ignore
+) -> Tuple[np.ndarray, float]:
+    """Remove num_seams seams along axis, batch_size of them per energy map and DP pass.
     
-    for i in range(v_seams):
-        if img.shape[1] <= min_dimension:
-            break
-        
-        if i % recalc_interval == 0:
-            energy_map = calculate_energy(img)
-        
-        seam = find_vertical_seam(energy_map)
-        img = remove_seam(img, seam, axis=1)
+    Returns the carved image and the summed energy of the removed pixels,
+    measured on the map each batch was chosen from. The image is carved in
+    place in one CarvingBuffer and returned as a view of its live region.
     
-    for i in range(h_seams):
-        if img.shape[0] <= min_dimension:
-            break
-        
-        if i % recalc_interval == 0:
+    forward='map' folds each pixel's cheapest forward cost into its energy
+    (calculate_energy); 'dp' adds the cost of the step each seam actually
+    takes in the DP (calculate_forward_energy), along the seam's direction.
+    
+    observer gets a SeamEvent per batch (see carving_events).
+    """
+    if forward not in ('map', 'dp'):
+        raise ValueError(f"Forward energy mode must be 'map' or 'dp', got {forward!r}")
+    buffer = CarvingBuffer(img)
+    img = buffer.image
+    removed, seam_energy = 0, 0.0
+    
+    while removed < num_seams and img.shape[axis] > min_dimension:
+        count = min(batch_size, num_seams - removed, img.shape[axis] - min_dimension)
+        start = time.perf_counter()
+        if forward == 'dp':
+            # Horizontal seams step from column to column, so their costs come from the transposed image
+            energy_map, costs = calculate_forward_energy(img if axis == 1 else img.swapaxes(0, 1))
+            mapped = time.perf_counter()
+            seams = find_vertical_seams(energy_map, count, pyramid_depth, band, costs)
+            cost = float(energy_map[np.arange(energy_map.shape[0]), seams].sum())
+        elif axis == 1:
             energy_map = calculate_energy(img)
-        
-        seam = find_vertical_seam(energy_map.T)
-        img = remove_seam(img, seam, axis=0)
+            mapped = time.perf_counter()
+            seams = find_vertical_seams(energy_map, count, pyramid_depth, band)
+            cost = float(energy_map[np.arange(img.shape[0]), seams].sum())
+        else:
+            energy_map = calculate_energy(img)
+            mapped = time.perf_counter()
+            seams = find_vertical_seams(energy_map.T, count, pyramid_depth, band)
+            cost = float(energy_map[seams, np.arange(img.shape[1])].sum())
+        found = time.perf_counter()
+        if len(seams) == 0:
+            break
+        seam_energy += cost
+        blend_seams(img, seams, axis=axis)
+        buffer.remove_seams(seams, axis=axis)
+        img = buffer.image
+        observer(SeamEvent(removed, 'vertical' if axis == 1 else 'horizontal', img.shape[:2],
+                           energy=mapped - start, dp=found - mapped,
+                           removal=time.perf_counter() - found, seams=len(seams), cost=cost))
+        removed += len(seams)
+    
+    return img, seam_energy
+
+
+def compress_image(
+    image_path: Union[str, Path],
+    num_seams: int,
+    direction: Literal['both', 'vertical', 'horizontal'] = 'both',
+    min_dimension: int = 2,
+    batch_size: int = 10,
+    pyramid_depth: int = 0,
+    band: int = 4,
+    forward: Literal['map', 'dp'] = 'map',
+    observer: Callable[[SeamEvent], None] = ignore
+) -> 'Image.Image':
+    """Compress image without logging; batch_size seams share one energy map and DP pass.
+    
+    pyramid_depth > 0 searches seams coarse to fine, refining within band
+    pixels of the coarse path (see find_vertical_seams); forward picks how
+    forward energy enters the search and observer gets a SeamEvent per batch
+    (see carve_seams).
+    """
+    if not Path(image_path).exists():
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    
+    from PIL import Image
+    img = np.array(Image.open(image_path))
+    v_seams, h_seams = split_seams(img, num_seams, direction)
+    
+    img, _ = carve_seams(img, v_seams, axis=1, batch_size=batch_size, min_dimension=min_dimension,
+                         pyramid_depth=pyramid_depth, band=band, forward=forward, observer=observer)
+    img, _ = carve_seams(img, h_seams, axis=0, batch_size=batch_size, min_dimension=min_dimension,
+                         pyramid_depth=pyramid_depth, band=band, forward=forward, observer=observer)
     
     return Image.fromarray(img)
 
+
+def compare_batch_sizes(
+    image_path: Union[str, Path],
+    num_seams: int,
+    batch_sizes: Tuple[int, ...] = (1, 5, 10, 20),
+    direction: Literal['both', 'vertical', 'horizontal'] = 'vertical'
+) -> list:
+    """Time and removed-energy of each batch size, relative to removing one seam at a time"""
+    from PIL import Image
+    img = np.array(Image.open(image_path))
+    v_seams, h_seams = split_seams(img, num_seams, direction)
+    results = []
+    
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        carved, v_energy = carve_seams(img, v_seams, axis=1, batch_size=batch_size)
+        carved, h_energy = carve_seams(carved, h_seams, axis=0, batch_size=batch_size)
+        results.append({
+            'batch_size': batch_size,
+            'seconds': time.perf_counter() - start,
+            'seam_energy': v_energy + h_energy,
+        })
+    
+    baseline = next((r['seam_energy'] for r in results if r['batch_size'] == 1), None)
+    for result in results:
+        result['energy_vs_single'] = result['seam_energy'] / baseline if baseline else None
+    
+    return results
+
+
+def compare_pyramid_depths(
+    energy_map: np.ndarray,
+    depths: Tuple[int, ...] = (0, 1, 2, 3, 4),
+    band: int = 4,
+    direction: Literal['vertical', 'horizontal'] = 'vertical',
+    repeats: int = 3
+) -> list:
+    """Seam search time and seam energy of each pyramid depth, relative to the exact search (depth 0)"""
+    if direction == 'vertical':
+        search = seam_dp.find_vertical_seams_pyramid
+    else:
+        search = seam_dp.find_horizontal_seams_pyramid
+    results = []
+    
+    for depth in depths:
+        seconds = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            seam = search(energy_map, 1, depth, band)[0]
+            seconds = min(seconds, time.perf_counter() - start)
+        if direction == 'vertical':
+            cells = (np.arange(len(seam)), seam)
+        else:
+            cells = (seam, np.arange(len(seam)))
+        results.append({
+            'depth': depth,
+            'seconds': seconds,
+            'seam_energy': float(energy_map[cells].sum()),
+        })
+    
+    exact = next((r for r in results if r['depth'] == 0), None)
+    for result in results:
+        result['energy_vs_exact'] = result['seam_energy'] / exact['seam_energy'] if exact and exact['seam_energy'] else None
+        result['speedup'] = exact['seconds'] / result['seconds'] if exact else None
+    
+    return results
+
 if __name__ == "__main__":
     input_path = "dory.png"
     output_path = "compressed_output.jpg"
@@ -0,0 +1,34 @@
+import numpy as np
+
+import carving_buffer
+from carving_buffer import CarvingBuffer
+from seam_dp import find_horizontal_seams, find_vertical_seams
+
+
+def delete_cells(img, seams, axis):
+    # The pixels left after masking out every seam's cells, each column (row) closing up in order
+    oriented = img if axis == 0 else img.swapaxes(0, 1)
+    mask = np.zeros(oriented.shape[:2], dtype=bool)
+    mask[seams, np.arange(seams.shape[1])] = True
+    kept = oriented.swapaxes(0, 1)[~mask.T].reshape(oriented.shape[1], -1, *oriented.shape[2:]).swapaxes(0, 1)
+    return kept if axis == 0 else kept.swapaxes(0, 1)
+
+
+def test_remove_seams_matches_mask_deletion(monkeypatch):
+    rng = np.random.default_rng(0)
+    for trial in range(200):
+        monkeypatch.setattr(carving_buffer, 'BLOCK_ROWS', int(rng.choice([1, 2, 3, 7, 64])))
+        # Now and then a batch past what an int8 shift holds
+        large = trial % 20 == 0
+        height, width = (rng.integers(260, 320), rng.integers(4, 8)) if large else rng.integers(2, 40, size=2)
+        channels = int(rng.choice([1, 3, 4]))
+        img = rng.integers(0, 256, size=(height, width, channels), dtype=np.uint8)
+        # Few distinct energies, so the seams tie, touch and cross block boundaries often
+        energy = rng.integers(0, 3, size=(height, width)).astype(np.float64)
+        for axis in (0, 1):
+            length = height if axis == 0 else width
+            count = int(rng.integers(length // 2 if large else 0, length))
+            seams = find_horizontal_seams(energy, count) if axis == 0 else find_vertical_seams(energy, count)
+            buffer = CarvingBuffer(img)
+            buffer.remove_seams(seams, axis=axis)
+            np.testing.assert_array_equal(buffer.image, delete_cells(img, seams, axis))
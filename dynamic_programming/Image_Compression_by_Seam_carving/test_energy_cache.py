@@ -0,0 +1,37 @@
+import numpy as np
+
+from energy_cache import EnergyCache
+from image_compression_by_seam_carving import calculate_energy
+from test import combine_energy_terms, energy_terms
+
+
+def random_seam(rng, length, across):
+    # A connected seam: one index in 0..across-1 per row, moving at most one between rows
+    seam = np.empty(length, dtype=np.int32)
+    seam[0] = rng.integers(across)
+    for i in range(1, length):
+        seam[i] = np.clip(seam[i - 1] + rng.integers(-1, 2), 0, across - 1)
+    return seam
+
+
+def test_energy_matches_full_recompute_after_interleaved_removals():
+    rng = np.random.default_rng(0)
+    for local_energy, combine, dtype in ((calculate_energy, None, None),
+                                         (energy_terms, combine_energy_terms, None),
+                                         (calculate_energy, None, np.float32)):
+        for _ in range(15):
+            height, width = rng.integers(4, 30, size=2)
+            img = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+            cache = EnergyCache(img, local_energy, combine, dtype=dtype)
+            # Down to images narrower than refresh_band's window, where it recomputes everything
+            while min(cache.image.shape[:2]) > 2:
+                for axis in (1, 0):
+                    height, width = cache.image.shape[:2]
+                    seam = random_seam(rng, height, width) if axis == 1 else random_seam(rng, width, height)
+                    cache.remove_seam(seam, axis=axis)
+                    expected = local_energy(cache.image)
+                    if dtype is not None:
+                        expected = expected.astype(dtype)
+                    if combine is not None:
+                        expected = combine(expected)
+                    np.testing.assert_array_equal(cache.energy, expected)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from energy_cache import EnergyCache
+from image_compression_by_seam_carving import calculate_energy
+from seam_dp import SeamFinder, cumulative_energy, find_horizontal_seam, find_vertical_seam
+
+
+def test_seam_finder_matches_fresh_dp_when_interleaved():
+    # carve()'s loop: one vertical, one horizontal seam at a time, each finder told about every removal
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        height, width = rng.integers(12, 40, size=2)
+        img = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        cache = EnergyCache(img, calculate_energy)
+        finders = {1: SeamFinder(axis=1), 0: SeamFinder(axis=0)}
+        for _ in range(8):
+            for axis, find in ((1, find_vertical_seam), (0, find_horizontal_seam)):
+                energy = cache.energy
+                seam = finders[axis].find(energy)
+                oriented = energy if axis == 1 else energy.T
+                fresh, _ = cumulative_energy(oriented)
+                rows, columns = oriented.shape
+                np.testing.assert_array_equal(finders[axis]._dp[:rows, 1:columns + 1], fresh)
+                np.testing.assert_array_equal(seam, find(energy))
+                for finder in finders.values():
+                    finder.seam_removed(seam, axis=axis)
+                cache.cut(seam, axis=axis)
+                cache.refresh(seam, axis=axis)
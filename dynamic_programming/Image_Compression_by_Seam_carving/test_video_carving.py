@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from video_carving import prefetch
+
+
+def test_prefetch_producer_exits_when_closed_early_with_a_failing_source():
+    closed = threading.Event()
+    before = set(threading.enumerate())
+
+    def frames():
+        yield 0
+        yield 1
+        # Raise only once the consumer has stopped reading, with the queue full
+        closed.wait(5)
+        raise OSError("unreadable frame")
+
+    frames_ahead = prefetch(frames(), size=1)
+    assert next(frames_ahead) == 0
+    frames_ahead.close()
+    closed.set()
+    for thread in set(threading.enumerate()) - before:
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+def test_prefetch_reraises_where_the_failing_item_would_arrive():
+    def frames():
+        yield 0
+        raise OSError("unreadable frame")
+
+    frames_ahead = prefetch(frames(), size=1)
+    assert next(frames_ahead) == 0
+    with pytest.raises(OSError):
+        next(frames_ahead)
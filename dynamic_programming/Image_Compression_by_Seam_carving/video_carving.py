@@ -0,0 +1,193 @@
+"""Seam carve a sequence of video frames, reusing each frame's seams for the next.
+
+    python video_carving.py frames/ carved/ --seams 40
+    python video_carving.py clip.gif carved/ --seams 40 --horizontal 10
+
+Neighbouring frames are nearly the same picture, so every seam of a frame
+is first searched for only within band columns of the same seam of the
+previous frame (refine_vertical_seam). That is far cheaper than a full DP
+pass and keeps the seams from jumping about between frames. Only when a
+seam found that way costs more than threshold times its predecessor does
+the frame fall back to the full search for it.
+
+Frames are read on a background thread into a bounded queue, so decoding
+the next frames overlaps carving the current one.
+"""
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from energy_cache import EnergyCache
+from image_compression_by_seam_carving import calculate_energy
+from seam_dp import find_vertical_seam, refine_vertical_seam, seam_cost
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+class FrameStats(NamedTuple):
+    """How one frame was carved: warm seams came from the band search, full ones from a full DP pass"""
+    index: int
+    seconds: float
+    warm_seams: int
+    full_searches: int
+
+
+def prefetch(items: Iterable, size: int = 4) -> Iterator:
+    """items, produced up to size ahead on a background thread.
+
+    An exception raised while producing is re-raised in the consumer at
+    the point where the failing item would have arrived.
+    """
+    if size < 1:
+        yield from items
+        return
+
+    buffer = queue.Queue(maxsize=size)
+    done = object()
+    stop = threading.Event()
+
+    def put(entry):
+        # Wait for room, but give up once the consumer has stopped reading; False when it has
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((None, e))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # A producer waiting on a full queue gives up once the consumer stops early
+        stop.set()
+
+
+def carve_frames(frames: Iterable[np.ndarray], vertical_seams: int, horizontal_seams: int = 0,
+                 band: int = 4, threshold: float = 1.25, prefetch_frames: int = 4,
+                 on_frame: Optional[Callable[[FrameStats], None]] = None) -> Iterator[np.ndarray]:
+    """Yield every frame carved by vertical_seams columns and horizontal_seams rows.
+
+    Seams are removed in carve()'s order, one vertical then one horizontal
+    while both remain. The first frame, and any seam whose warm-started
+    version costs more than threshold times the previous frame's, gets the
+    full search. All frames must have the first frame's shape.
+    """
+    order = [axis for i in range(max(vertical_seams, horizontal_seams))
+             for axis, count in ((1, vertical_seams), (0, horizontal_seams)) if i < count]
+    previous = None  # (seam, cost) of every step of the last frame
+    shape = None
+
+    for index, frame in enumerate(prefetch(frames, prefetch_frames)):
+        start = time.perf_counter()
+        if shape is None:
+            shape = frame.shape
+        elif frame.shape != shape:
+            raise ValueError(f"Frame {index} has shape {frame.shape}, the first frame {shape}")
+
+        cache = EnergyCache(frame, calculate_energy)
+        steps, warm, full = [], 0, 0
+        for step, axis in enumerate(order):
+            # Horizontal seams are vertical seams of the transposed map
+            energy = cache.energy if axis == 1 else cache.energy.T
+            seam = None
+            if previous is not None:
+                guide, guide_cost = previous[step]
+                seam = refine_vertical_seam(energy, guide, band)
+                if seam is not None and seam_cost(energy, seam) > threshold * guide_cost:
+                    seam = None
+            if seam is None:
+                seam = find_vertical_seam(energy)
+                full += 1
+            else:
+                warm += 1
+            steps.append((seam, seam_cost(energy, seam)))
+            cache.remove_seam(seam, axis=axis)
+        previous = steps
+
+        carved = cache.image.copy()
+        if on_frame is not None:
+            on_frame(FrameStats(index, time.perf_counter() - start, warm, full))
+        yield carved
+
+
+def read_frames(source: Union[str, Path]) -> Iterator[np.ndarray]:
+    """Frames of an animated image (GIF, APNG, ...) or, sorted by name, of a directory or glob of images"""
+    from PIL import Image, ImageSequence
+
+    source = str(source)
+    if os.path.isfile(source):
+        with Image.open(source) as animation:
+            for frame in ImageSequence.Iterator(animation):
+                yield np.array(frame.convert('RGB'))
+        return
+    paths = Path(source).iterdir() if os.path.isdir(source) else map(Path, glob.glob(source))
+    for path in sorted(path for path in paths if path.suffix.lower() in IMAGE_SUFFIXES):
+        with Image.open(path) as img:
+            yield np.array(img.convert('RGB'))
+
+
+def carve_video(source: Union[str, Path], output_dir: Union[str, Path], vertical_seams: int,
+                horizontal_seams: int = 0, band: int = 4, threshold: float = 1.25,
+                prefetch_frames: int = 4) -> List[FrameStats]:
+    """Carve every frame of source into numbered PNGs in output_dir and print the frames/s"""
+    from PIL import Image
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stats = []
+    start = time.perf_counter()
+    frames = carve_frames(read_frames(source), vertical_seams, horizontal_seams, band, threshold,
+                          prefetch_frames, on_frame=stats.append)
+    for index, frame in enumerate(frames):
+        Image.fromarray(frame).save(output_dir / f"frame_{index:05d}.png")
+    elapsed = time.perf_counter() - start
+
+    warm = sum(frame.warm_seams for frame in stats)
+    full = sum(frame.full_searches for frame in stats)
+    if stats and elapsed > 0:
+        print(f"{len(stats)} frames in {elapsed:.2f}s: {len(stats) / elapsed:.2f} frames/s "
+              f"({warm} warm-started seams, {full} full searches)")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Seam carve the frames of a clip with temporally coherent seams")
+    parser.add_argument('source', help="animated image, or a directory or glob of frame images")
+    parser.add_argument('output_dir', help="directory the carved frames are written to")
+    parser.add_argument('--seams', type=int, required=True, help="vertical seams to remove from every frame")
+    parser.add_argument('--horizontal', type=int, default=0, help="horizontal seams to remove from every frame")
+    parser.add_argument('--band', type=int, default=4, help="columns either side of last frame's seam to search")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="redo a seam with the full search when it costs this many times last frame's")
+    parser.add_argument('--prefetch', type=int, default=4, help="frames decoded ahead of the carving")
+    args = parser.parse_args(argv)
+    carve_video(args.source, args.output_dir, args.seams, args.horizontal, args.band, args.threshold, args.prefetch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def work_array(shape: Tuple[int, ...], dtype, directory: Optional[str] = None) -> np.ndarray:
+    """Uninitialised working array, in memory or backed by a temporary file in directory.
+
+    The file is anonymous and disappears with the array, so the OS can page
+    the array out to it instead of keeping it all resident.
+    """
+    if directory is None:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(tempfile.TemporaryFile(dir=directory), dtype=dtype, mode='w+', shape=shape)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB (None where the OS does not report it)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
@@ -1,10 +1,12 @@
 import numpy as np 
-np.random.seed(20)
 num_months = 12
 free_production_per_month = 15
 min_possible_demand = 1
 max_possible_demand = 30
-demand_per_month = np.random.randint(min_possible_demand, max_possible_demand, num_months)
+
+def random_demand(num_months, min_demand, max_demand, seed=20):
+    # Same demand as seeding the global generator and calling np.random.randint, without touching global state
+    return np.random.RandomState(seed).randint(min_demand, max_demand, num_months)
 
 def c(x):
     # 3 cost per machine produced over m 
@@ -50,6 +52,72 @@ def fill_dp_matrix(num_months, free_production_quantity, demand_per_month_array)
     best_cost = dp[0, 0]
     return (production_table, best_cost)
 
+# Largest (inventory x choice) block compared at once by plan_production
+BLOCK_CELLS = 1 << 18
+
+def count_dtype(n):
+    # Smallest unsigned type that holds every count up to n
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+def fill_backpointers(num_months, free_production_quantity, demand_per_month_array, c=c, h=h):
+    # Same costs as fill_dp_matrix: machines past the free ones cost c, machines left at the end of a month
+    # cost h, and the last month must end empty. F(i, s) is the cheapest way through months i.. when month i
+    # starts with s machines; producing x leaves e = s + x - demand[i] >= 0, so
+    # F(i, s) = min over e of c(max(x - free, 0)) + h(e) + F(i+1, e)
+    # Only F(i+1, .) and F(i, .) are kept. c and h are called once per month on arrays of quantities.
+    # Returns production[i, s], the x chosen in month i when it starts with s machines, and the best cost
+    demand = np.asarray(demand_per_month_array[:num_months], dtype=np.int64)
+    # No more than the demand still to come can be worth holding at the start of a month
+    remaining = np.append(np.cumsum(demand[::-1])[::-1], 0)
+    big_d = int(remaining[0])
+    production = np.zeros((num_months, big_d + 1), dtype=count_dtype(big_d))
+    m = free_production_quantity
+    later = np.zeros(1)  # F(num_months, 0) = 0: nothing left over
+    for month in range(num_months - 1, -1, -1):
+        stock, ending = int(remaining[month]), len(later)
+        # what producing x costs, at index x + stock; negative x (more stock than needed) is impossible
+        paid = np.concatenate([np.full(stock, np.inf), c(np.maximum(np.arange(stock + 1) - m, 0))])
+        # starting with s, ending with e = 0, 1, ... means producing e - s + demand: one window of paid per s
+        windows = np.lib.stride_tricks.sliding_window_view(paid, ending)
+        shift = stock + int(demand[month])
+        # cost of ending the month with e machines, from here on
+        after = h(np.arange(ending)) + later
+        costs = np.empty(stock + 1)
+        # a block of starting inventories s against every ending inventory e at once
+        rows = max(1, BLOCK_CELLS // ending)
+        for first in range(0, stock + 1, rows):
+            last = min(first + rows, stock + 1) - 1
+            total = windows[shift - last:shift - first + 1][::-1] + after
+            # argmin takes the first of equal costs: the smallest ending inventory, so the least production
+            best = np.argmin(total, axis=1)
+            costs[first:last + 1] = np.take_along_axis(total, best[:, None], axis=1)[:, 0]
+            production[month, first:last + 1] = best - np.arange(first, last + 1) + int(demand[month])
+        later = costs
+    return production, later[0]
+
+def plan_from_backpointers(production, demand_per_month_array):
+    # Follow the choices from an empty start: how many machines to produce each month
+    plan = []
+    inventory = 0
+    for month in range(production.shape[0]):
+        produced = int(production[month, inventory])
+        plan.append(produced)
+        inventory += produced - int(demand_per_month_array[month])
+    return np.array(plan, dtype=np.int64)
+
+def plan_production(num_months, free_production_quantity, demand_per_month_array, c=c, h=h):
+    # The production plan and its cost, from the backpointers of fill_backpointers
+    production, best_cost = fill_backpointers(num_months, free_production_quantity, demand_per_month_array, c, h)
+    return plan_from_backpointers(production, demand_per_month_array), best_cost
+
+def print_plan(plan, best_cost):
+    for i, production_quantity in enumerate(plan):
+        print(f"In month {i + 1}, produce {production_quantity} machines.")
+    print(f"For a total cost of: {int(best_cost)}")
+
 def print_results(results):
     production_table, best_cost = results
     best_cost = int(best_cost)
@@ -59,4 +127,6 @@ def print_results(results):
         print(f"In month {i + 1}, produce {production_quantity} machines.")
     print(f"For a total cost of: {best_cost}")
 
-print_results(fill_dp_matrix(num_months,free_production_per_month,demand_per_month))
\ No newline at end of file
+if __name__ == "__main__":
+    demand_per_month = random_demand(num_months, min_possible_demand, max_possible_demand)
+    print_results(fill_dp_matrix(num_months,free_production_per_month,demand_per_month))
\ No newline at end of file
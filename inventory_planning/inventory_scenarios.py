@@ -0,0 +1,153 @@
+"""Solve inventory_planning's production problem for many sampled demand scenarios at once.
+
+    demand = random_demand_matrix(20000, 12, 1, 30)
+    for scenario, cost, plan in stream_scenarios(demand, 15, processes=4):
+        ...
+    print(scenario_statistics(stream_scenarios(demand, 15)))
+
+Scenarios are solved a chunk at a time. Inside a chunk they go through the
+months together: the same step as plan_production, with the scenarios as
+one more NumPy axis, for as many scenarios as fit BATCH_CELLS given the
+largest total demand. A scenario too large to share a batch is solved on
+its own by plan_production. Chunks run in a process pool when processes is
+above 1, and only each scenario's cost and plan are kept, never its tables.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from inventory_planning import c, count_dtype, h, plan_production
+
+# Largest (scenario x inventory x choice) block compared at once
+BATCH_CELLS = 1 << 22
+
+
+def random_demand_matrix(num_scenarios, num_months, min_demand, max_demand, seed=20):
+    # One row per scenario; the first row is random_demand(num_months, min_demand, max_demand, seed)
+    return np.random.RandomState(seed).randint(min_demand, max_demand, (num_scenarios, num_months))
+
+
+def solve_batch(demand_matrix, free_production_quantity, c=c, h=h):
+    # plan_production for every row of demand_matrix together: (plans, costs), with the same plans,
+    # since every scenario's choices are compared in the same order.
+    # States are as wide as the largest scenario's; past a scenario's own demand they cost inf
+    demand = np.asarray(demand_matrix, dtype=np.int64)
+    scenarios, num_months = demand.shape
+    remaining = np.concatenate([np.cumsum(demand[:, ::-1], axis=1)[:, ::-1],
+                                np.zeros((scenarios, 1), dtype=np.int64)], axis=1)
+    widest = int(remaining[:, 0].max(initial=0))
+    production = np.zeros((scenarios, num_months, widest + 1), dtype=count_dtype(widest))
+    m = free_production_quantity
+    later = np.zeros((scenarios, 1))
+    for month in range(num_months - 1, -1, -1):
+        stock, ending = int(remaining[:, month].max()), later.shape[1]
+        largest = int(demand[:, month].max())
+        # what producing x costs, at index x + stock, for every x any scenario can need this month
+        paid = np.concatenate([np.full(stock, np.inf), c(np.maximum(np.arange(ending + largest) - m, 0))])
+        windows = np.lib.stride_tricks.sliding_window_view(paid, ending)
+        starts = np.arange(stock + 1)
+        after = h(np.arange(ending)) + later
+        costs = np.empty((scenarios, stock + 1))
+        # starting with s means producing e - s + demand for every e: scenarios with the same demand this
+        # month read the same windows of paid
+        for value in np.unique(demand[:, month]):
+            group = np.flatnonzero(demand[:, month] == value)
+            shift = stock + int(value)
+            total = windows[shift - stock:shift + 1][::-1] + after[group, None, :]
+            best = np.argmin(total, axis=2)
+            costs[group] = np.take_along_axis(total, best[:, :, None], axis=2)[:, :, 0]
+            production[group, month, :stock + 1] = best - starts + value
+        later = costs
+
+    plans = np.zeros((scenarios, num_months), dtype=np.int64)
+    inventory = np.zeros(scenarios, dtype=np.int64)
+    rows = np.arange(scenarios)
+    for month in range(num_months):
+        plans[:, month] = production[rows, month, inventory]
+        inventory += plans[:, month] - demand[:, month]
+    return plans, later[:, 0]
+
+
+def solve_chunk(demand_matrix, free_production_quantity, c=c, h=h):
+    # (plans, costs) of a chunk, in batches that fit BATCH_CELLS
+    demand = np.asarray(demand_matrix, dtype=np.int64)
+    scenarios, num_months = demand.shape
+    plans = np.zeros((scenarios, num_months), dtype=np.int64)
+    costs = np.zeros(scenarios)
+    widest = int(demand.sum(axis=1).max(initial=0))
+    batch = BATCH_CELLS // ((widest + 1) * (widest + 1))
+    if batch < 1:
+        for scenario in range(scenarios):
+            plans[scenario], costs[scenario] = plan_production(num_months, free_production_quantity,
+                                                               demand[scenario], c, h)
+        return plans, costs
+    # Scenarios of similar total demand share a batch, so little of each batch is padding
+    order = np.argsort(demand.sum(axis=1), kind='stable')
+    for first in range(0, scenarios, batch):
+        rows = order[first:first + batch]
+        plans[rows], costs[rows] = solve_batch(demand[rows], free_production_quantity, c, h)
+    return plans, costs
+
+
+def stream_scenarios(demand_matrix, free_production_quantity, c=c, h=h, chunk_size=1000, processes=1):
+    # Yields (scenario, cost, plan) for every row of demand_matrix, in order, as chunks finish.
+    # With processes above 1 (None: one per CPU) the chunks are solved in that many processes, a few chunks ahead of the
+    # consumer; c and h then have to be picklable (module-level functions, not lambdas)
+    chunks = (demand_matrix[first:first + chunk_size] for first in range(0, len(demand_matrix), chunk_size))
+    if processes == 1:
+        solved = (solve_chunk(chunk, free_production_quantity, c, h) for chunk in chunks)
+        yield from flatten(solved)
+        return
+    ahead = 2 * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(processes) as pool:
+        pending = deque()
+
+        def solved():
+            for chunk in chunks:
+                pending.append(pool.submit(solve_chunk, chunk, free_production_quantity, c, h))
+                # keep the pool busy without queueing up every chunk's results
+                if len(pending) > ahead:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        yield from flatten(solved())
+
+
+def flatten(solved_chunks):
+    scenario = 0
+    for plans, costs in solved_chunks:
+        for plan, cost in zip(plans, costs):
+            yield scenario, float(cost), plan
+            scenario += 1
+
+
+def scenario_statistics(results, percentiles=(5, 25, 50, 75, 95)):
+    # Mean and percentiles of the total cost, and the mean production per month, over (scenario, cost, plan)
+    # results such as stream_scenarios yields; only the costs and one running plan total are kept
+    costs = []
+    plan_total = None
+    for _, cost, plan in results:
+        costs.append(cost)
+        plan_total = plan.astype(np.float64) if plan_total is None else plan_total + plan
+    if not costs:
+        raise ValueError("No scenarios to summarise")
+    costs = np.array(costs)
+    return {
+        'scenarios': len(costs),
+        'mean': float(costs.mean()),
+        'std': float(costs.std()),
+        'percentiles': {p: float(value) for p, value in zip(percentiles, np.percentile(costs, percentiles))},
+        'mean_plan': plan_total / len(costs),
+    }
+
+
+def print_statistics(statistics):
+    print(f"{statistics['scenarios']} scenarios, mean cost {statistics['mean']:.1f} "
+          f"(std {statistics['std']:.1f})")
+    for p, value in statistics['percentiles'].items():
+        print(f"  p{p}: {value:.1f}")
+    for i, production_quantity in enumerate(statistics['mean_plan']):
+        print(f"In month {i + 1}, produce {production_quantity:.1f} machines on average.")
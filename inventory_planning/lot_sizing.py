@@ -0,0 +1,125 @@
+"""Inventory plans in time polynomial in the number of months, whatever the demand volume.
+
+    plan, cost = plan_inventory(num_months, free_production_quantity, demand)
+
+plan_production's tables are as wide as the total demand. When the costs
+have the right shape the plan follows from the months alone:
+
+- c and h linear (a per unit produced past the free ones, b per unit held
+  per month), any free quantity: a free unit made in month i and held to
+  month j costs b * (j - i), a paid one made in month j costs a, and every
+  month ranks the earlier free units the same way, most recent first. So
+  taking each month's demand from its own free units, then from the most
+  recent spare ones while b * (j - i) < a, then paying for the rest is
+  optimal: O(months).
+- no free quantity, c and h concave (linear included): some optimal plan
+  only produces when the inventory is empty, each time for a run of whole
+  months (Wagner-Whitin): O(months * months).
+
+Anything else goes to plan_production. The shapes are detected from c and
+h on a sample of quantities up to the total demand, not on every quantity.
+"""
+import numpy as np
+
+from inventory_planning import c, h, plan_production
+
+# Relative tolerance when comparing sampled costs with a line or a concave curve
+SHAPE_TOLERANCE = 1e-9
+
+
+def cost_shape(f, limit):
+    # 'linear' (f(x) = slope * x), 'concave' or 'general' on sampled quantities 0..limit, and the slope
+    small = np.arange(min(limit, 16) + 1)
+    spread = np.unique(np.geomspace(1, max(limit, 1), 48).astype(np.int64)) if limit > 16 else small[:0]
+    quantities = np.unique(np.concatenate([small, spread, [limit]])).astype(np.int64)
+    values = np.asarray(f(quantities), dtype=np.float64) * np.ones(len(quantities))
+    if not np.all(np.isfinite(values)) or len(quantities) < 2:
+        return 'general', None
+    scale = SHAPE_TOLERANCE * max(1.0, float(np.abs(values).max()))
+    slope = values[1] - values[0]
+    if abs(values[0]) <= scale and np.allclose(values, slope * quantities, rtol=0, atol=scale):
+        return 'linear', slope
+    slopes = np.diff(values) / np.diff(quantities)
+    if np.all(np.diff(slopes) <= scale):
+        return 'concave', None
+    return 'general', None
+
+
+def plan_cost(plan, free_production_quantity, demand, c=c, h=h):
+    # What a plan costs under plan_production's rules
+    plan = np.asarray(plan, dtype=np.int64)
+    inventory = np.cumsum(plan - demand)
+    return float(np.sum(c(np.maximum(plan - free_production_quantity, 0))) + np.sum(h(inventory)))
+
+
+def plan_linear(free_production_quantity, demand, unit_cost, holding_cost):
+    # Linear costs: serve each month from its own free units, the newest spare free units worth holding, then paid ones
+    m = free_production_quantity
+    produced = [0] * len(demand)
+    spare = []  # [month, free units it could still make], newest last
+    for month, needed in enumerate(int(d) for d in demand):
+        own = min(m, needed)
+        produced[month] += needed
+        needed -= own
+        while needed and spare and holding_cost * (month - spare[-1][0]) < unit_cost:
+            earlier, units = spare[-1]
+            taken = min(units, needed)
+            # made for free back then instead of paid for now
+            produced[earlier] += taken
+            produced[month] -= taken
+            needed -= taken
+            if taken == units:
+                spare.pop()
+            else:
+                spare[-1][1] -= taken
+        if own < m:
+            spare.append([month, m - own])
+    return np.array(produced, dtype=np.int64)
+
+
+def plan_wagner_whitin(demand, c=c, h=h):
+    # No free units, concave c and h: best[j] is the cheapest way through the first j months ending empty,
+    # the last run producing months i..j-1's demand in month i
+    months = len(demand)
+    total = np.concatenate([[0], np.cumsum(demand)]).astype(np.int64)
+    best = np.zeros(months + 1)
+    start = np.zeros(months + 1, dtype=np.int64)
+    idle = float(np.asarray(c(np.zeros(1, dtype=np.int64)))[0])  # c(0), paid by months that produce nothing
+    for j in range(1, months + 1):
+        runs = np.arange(j)
+        # month k of the run ends holding the demand of months k+1..j-1
+        held = h(total[j] - total[1:j + 1]) * np.ones(j)
+        holding = np.cumsum(held[::-1])[::-1]
+        costs = best[:j] + c(total[j] - total[:j]) + holding + (j - 1 - runs) * idle
+        start[j] = np.argmin(costs)
+        best[j] = costs[start[j]]
+    plan = np.zeros(months, dtype=np.int64)
+    j = months
+    while j > 0:
+        i = start[j]
+        plan[i] = total[j] - total[i]
+        j = i
+    return plan
+
+
+def fast_plan(num_months, free_production_quantity, demand_per_month_array, c=c, h=h):
+    # The plan from whichever fast path the cost shapes allow, or None when neither applies
+    demand = np.asarray(demand_per_month_array[:num_months], dtype=np.int64)
+    limit = int(demand.sum())
+    production_shape, unit_cost = cost_shape(c, limit)
+    holding_shape, holding_cost = cost_shape(h, limit)
+    if production_shape == 'linear' and holding_shape == 'linear' and unit_cost >= 0 and holding_cost >= 0:
+        return plan_linear(free_production_quantity, demand, unit_cost, holding_cost)
+    if free_production_quantity == 0 and production_shape != 'general' and holding_shape != 'general':
+        return plan_wagner_whitin(demand, c, h)
+    return None
+
+
+def plan_inventory(num_months, free_production_quantity, demand_per_month_array, c=c, h=h):
+    # (plan, cost) like plan_production, through a fast path when the costs allow one
+    plan = fast_plan(num_months, free_production_quantity, demand_per_month_array, c, h)
+    if plan is None:
+        return plan_production(num_months, free_production_quantity, demand_per_month_array, c, h)
+    demand = np.asarray(demand_per_month_array[:num_months], dtype=np.int64)
+    return plan, plan_cost(plan, free_production_quantity, demand, c, h)
+
@@ -0,0 +1,33 @@
+import numpy as np
+
+from inventory_planning import c, h, plan_production, random_demand
+from lot_sizing import cost_shape, fast_plan, plan_cost
+
+# (c, h) pairs: the module's own, linear ones, concave production and a setup cost
+COSTS = [(c, h), (lambda x: x * 2, lambda x: x * 3), (lambda x: x * 7, lambda x: x * 0.5),
+         (lambda x: np.sqrt(x) * 9, lambda x: x * 1.5), (lambda x: np.where(x > 0, 20 + x, 0), h)]
+
+
+def test_fast_paths_cost_the_same_as_plan_production():
+    rng = np.random.RandomState(0)
+    for trial in range(200):
+        num_months = rng.randint(1, 13)
+        free = 0 if trial % 2 else rng.randint(0, 20)
+        demand = random_demand(num_months, 0, 30, seed=trial)
+        for production_cost, holding_cost in COSTS:
+            plan = fast_plan(num_months, free, demand, production_cost, holding_cost)
+            if plan is None:
+                continue
+            expected = plan_production(num_months, free, demand, production_cost, holding_cost)[1]
+            inventory = np.cumsum(plan - demand)
+            assert np.all(inventory >= 0) and inventory[-1] == 0, (demand, free, plan)
+            assert np.isclose(plan_cost(plan, free, demand, production_cost, holding_cost), expected), \
+                (demand, free, plan, expected)
+
+
+def test_cost_shapes():
+    assert cost_shape(lambda x: x * 2, 500) == ('linear', 2)
+    assert cost_shape(lambda x: np.sqrt(x) * 9, 500)[0] == 'concave'
+    assert cost_shape(lambda x: x * x, 500)[0] == 'general'
+    # a free quantity with a setup cost leaves only plan_production
+    assert fast_plan(3, 5, [4, 6, 2], lambda x: np.where(x > 0, 20 + x, 0), h) is None